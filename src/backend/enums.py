@@ -1,8 +1,8 @@
-from enum import Enum
+from enum import Enum, IntEnum
 from typing import Any
 
 
-class Axis(Enum):
+class Axis(IntEnum):
     """Rotation axis."""
 
     X = 0
@@ -78,7 +78,13 @@ class Move(Enum):
         return hash(self._key)
 
 
-class State(Enum):
+# rotation move around each axis
+ROTATION_OF_AXIS = {Axis.X: Move.RX, Axis.Y: Move.RY, Axis.Z: Move.RZ}
+# controlled rotation move around each axis
+CONTROLLED_ROTATION_OF_AXIS = {Axis.X: Move.CRX, Axis.Y: Move.CRY, Axis.Z: Move.CRZ}
+
+
+class State(IntEnum):
     """State of a cell on board, or the winner of a game."""
 
     EMPTY = 0
@@ -99,3 +105,6 @@ class State(Enum):
                 return "?"
             case State.ENTANGLED:
                 return "e"
+
+    def __format__(self, format_spec: str) -> str:
+        return format(str(self), format_spec)
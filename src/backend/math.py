@@ -2,7 +2,7 @@ from backend.enums import Axis
 import numpy as np
 
 
-def rotate_vec(vec: list[int], angle: float, axis: Axis) -> list[int]:
+def rotate_vec(vec: np.ndarray, angle: float, axis: Axis) -> np.ndarray:
     """Rotate `vec` `angle` radians along `axis`.
 
     Args:
@@ -1,27 +1,101 @@
+import functools
 import random
 
+import numpy as np
 from qiskit import QuantumCircuit, generate_preset_pass_manager
+from qiskit.circuit import ParameterVector
 from qiskit.converters import circuit_to_dag, dag_to_circuit
-from qiskit.transpiler import CouplingMap
+from qiskit.quantum_info import Statevector
+from qiskit.transpiler import CouplingMap, PassManager
 from qiskit.providers import BackendV2
 from qiskit_ibm_runtime import SamplerV2
 from backend.math import rotate_vec
 from backend.enums import State, Move, Axis
 
+# bitmasks of the cells that win a board, bit i is cell i
+_WIN_LINES = (
+    # horisontal
+    0o007,
+    0o070,
+    0o700,
+    # vertrical
+    0o111,
+    0o222,
+    0o444,
+    # diagonal
+    0o421,
+    0o124,
+)
+
+# qubit index of each board and cell
+_QUBIT_OF = tuple(tuple(b * 9 + c for c in range(9)) for b in range(9))
+# qubit indices of each board
+_SLICE_OF = tuple(slice(b * 9, b * 9 + 9) for b in range(9))
+
+# cell states taken by a player
+_XO = frozenset((State.X, State.O))
+# cell states that can still be measured
+_UNMEASURED = frozenset((State.EMPTY, State.ENTANGLED))
+
+# bit of each cell in a board bitmask
+_CELL_BITS = 1 << np.arange(9)
+
+# max. number of qubits of a sub-circuit that is sampled from its exact state vector on a simulator
+_EXACT_MAX_QUBITS = 12
+
+
+def _winner(x_mask: int, o_mask: int, full: bool) -> State:
+    """Get the winner of a board from the cells taken by each player.
 
+    Args:
+        x_mask: bitmask of the cells taken by X
+        o_mask: bitmask of the cells taken by O
+        full: whether the board has no empty cells
+
+    Returns:
+        winner of the board. `State.DRAW` iff draw. `State.EMPTY` iff board has not ended.
+    """
+
+    x_won = any(x_mask & line == line for line in _WIN_LINES)
+    o_won = any(o_mask & line == line for line in _WIN_LINES)
+
+    if x_won and o_won:
+        return State.DRAW
+    if x_won:
+        return State.X
+    if o_won:
+        return State.O
+    return State.DRAW if full else State.EMPTY
+
+
+@functools.cache
 def fully_connected_81_coupling():
     """
     Build a CouplingMap for 81 qubits, fully connected,
     so we skip 'CircuitTooWideForTarget' issues and routing constraints.
+
+    The map is built once and shared.
     """
 
-    edges = []
-    for i in range(81):
-        for j in range(81):
-            if i != j:
-                edges.append((i, j))
+    return CouplingMap.from_full(81)
 
-    return CouplingMap(edges)
+
+def is_ideal_simulator(backend: BackendV2) -> bool:
+    """Check whether `backend` is a noiseless Aer simulator.
+
+    Results of an ideal simulator can be computed exactly instead of running it.
+
+    Args:
+        backend: backend to check
+
+    Returns:
+        whether `backend` is an Aer simulator without a noise model
+    """
+
+    return (
+        backend.name.startswith("aer_simulator")
+        and getattr(backend.options, "noise_model", None) is None
+    )
 
 
 def get_fair_bitstring(counts: dict, threshold: float, total: int) -> str:
@@ -36,21 +110,174 @@ def get_fair_bitstring(counts: dict, threshold: float, total: int) -> str:
     Returns:
         Returns a bitstring as if the circuit was run 1 time without noise.
     """
-    probabilities = {state: count / total for state, count in counts.items()}
-    try:
-        filtered_probabilities = {state: prob for state, prob in probabilities.items() if prob >= threshold}
-        if not filtered_probabilities:
-            raise ValueError("All states were filtered out.")
-    except ValueError:
-        filtered_probabilities = {max(counts, key=counts.get): 1}
-    total_prob = sum(filtered_probabilities.values())
-    normalized_probabilities = {state: prob / total_prob for state, prob in filtered_probabilities.items()}
-    states, probs = zip(*normalized_probabilities.items())
-    chosen_state = random.choices(states, weights=probs, k=1)[0]
+    states = list(counts)
+    probabilities = np.fromiter(counts.values(), dtype=np.float64, count=len(states)) / total
+    # discard values under the threshold, keep the most likely state if all are discarded
+    mask = probabilities >= threshold
+    if not mask.any():
+        return states[probabilities.argmax()]
+    filtered_probabilities = np.where(mask, probabilities, 0)
+    normalized_probabilities = filtered_probabilities / filtered_probabilities.sum()
+    chosen_state = states[np.random.choice(len(states), p=normalized_probabilities)]
     return chosen_state
 
 
-def run_circuit(qc: QuantumCircuit, backend: BackendV2, shots: int, cmap: CouplingMap | None = None) -> dict:
+def sample_qubit(p_one: float, threshold: float) -> str:
+    """
+    Sample the measurement outcome of a single qubit without running a circuit.
+
+    Outcomes with a probability under the threshold are discarded, like in `get_fair_bitstring`.
+
+    Args:
+        p_one: The probability of measuring 1
+        threshold: The noise level threshold, outcomes under this threshold are discarded
+
+    Returns:
+        Returns "1" or "0".
+    """
+    if p_one < threshold:
+        return "0"
+    if 1 - p_one < threshold:
+        return "1"
+    return "1" if random.random() < p_one else "0"
+
+
+def circuit_key(qc: QuantumCircuit) -> tuple:
+    """
+    Get a hashable key describing the structure of a circuit.
+
+    Gate parameters are not part of the key, circuits with the same key transpile to the same
+    template (see `circuit_template`).
+
+    Args:
+        qc: The circuit to describe
+
+    Returns:
+        A tuple of the circuit size, register names and instructions
+    """
+    return (
+        qc.num_qubits,
+        qc.num_clbits,
+        tuple(creg.name for creg in qc.cregs),
+        tuple(
+            (
+                instr.operation.name,
+                tuple(qc.find_bit(qubit).index for qubit in instr.qubits),
+                tuple(qc.find_bit(clbit).index for clbit in instr.clbits),
+            )
+            for instr in qc.data
+        ),
+    )
+
+
+def circuit_parameters(qc: QuantumCircuit) -> list[float]:
+    """
+    Get the gate parameters of a circuit.
+
+    Args:
+        qc: The circuit to get the parameters of
+
+    Returns:
+        The parameters of every instruction, in order
+    """
+    return [float(param) for instr in qc.data for param in instr.operation.params]
+
+
+def circuit_template(qc: QuantumCircuit) -> QuantumCircuit:
+    """
+    Replace the gate parameters of a circuit with the elements of a `ParameterVector`.
+
+    Element i of the vector takes the place of `circuit_parameters(qc)[i]`.
+
+    Args:
+        qc: The circuit to make a template of
+
+    Returns:
+        The parameterized circuit
+    """
+    n_params = sum(len(instr.operation.params) for instr in qc.data)
+    theta = iter(ParameterVector("θ", n_params))
+    template = qc.copy_empty_like()
+    for instr in qc.data:
+        operation = instr.operation
+        if operation.params:
+            operation = type(operation)(*(next(theta) for _ in operation.params))
+        template.append(operation, instr.qubits, instr.clbits, copy=False)
+    return template
+
+
+def run_circuits(
+        qcs: list[QuantumCircuit],
+        backend: BackendV2,
+        shots: list[int],
+        cmap: CouplingMap | None = None,
+        pm: PassManager | None = None,
+        isa_cache: dict | None = None,
+        isa_cache_size: int | None = None,
+) -> list[dict]:
+    """
+    Run the given quantum circuits on the provided backend in a single job.
+
+    Args:
+        qcs:  the quantum circuits to run
+        backend: the backend to run on
+        shots:  the amount of shots for each circuit
+        cmap:  the coupling map needed for the 81-qubit circuit
+        pm:  the pass manager to transpile with. A new one is generated if not given
+        isa_cache:  transpiled templates by `circuit_key`. Only circuits missing from it are
+            transpiled, the gate parameters are bound when running
+        isa_cache_size:  max. number of templates kept in `isa_cache`. The least recently used
+            ones are dropped first. Unbounded if not given
+
+    Returns:
+        returns the counts variable form the job result for each circuit.
+    """
+    if pm is None:
+        pm = generate_preset_pass_manager(backend=backend, optimization_level=3, coupling_map=cmap)
+    if isa_cache is None:
+        pubs = [(isa_circuit, None, n) for isa_circuit, n in zip(pm.run(qcs), shots)]
+    else:
+        keys = [circuit_key(qc) for qc in qcs]
+        if isa_cache_size is not None:
+            # move the used templates to the end, dicts keep insertion order
+            for key in keys:
+                if key in isa_cache:
+                    isa_cache[key] = isa_cache.pop(key)
+        # transpile every missing structure once
+        missing = {key: circuit_template(qc) for key, qc in zip(keys, qcs) if key not in isa_cache}
+        if missing:
+            for key, isa_template in zip(missing, pm.run(list(missing.values()))):
+                # the transpiler may drop parameters, remember which ones are left
+                isa_cache[key] = isa_template, [param.index for param in isa_template.parameters]
+        pubs = []
+        for key, qc, n in zip(keys, qcs, shots):
+            isa_template, indices = isa_cache[key]
+            values = circuit_parameters(qc)
+            pubs.append((isa_template, [values[i] for i in indices] if indices else None, n))
+        if isa_cache_size is not None:
+            # drop the least recently used templates
+            while len(isa_cache) > isa_cache_size:
+                del isa_cache[next(iter(isa_cache))]
+    sampler = SamplerV2(mode=backend)
+    # one pub per circuit, each with its own amount of shots
+    job = sampler.run(pubs)
+    result = job.result()
+    counts = []
+    for qc, pub_result in zip(qcs, result):
+        try:
+            counts.append(getattr(pub_result.data, qc.cregs[0].name, None).get_counts())
+        except AttributeError:
+            raise SystemError("Empty or invalid result..")  # Handle this?
+    return counts
+
+
+def run_circuit(
+        qc: QuantumCircuit,
+        backend: BackendV2,
+        shots: int,
+        cmap: CouplingMap | None = None,
+        pm: PassManager | None = None,
+) -> dict:
     """
     Run a given quantum circuit on the provided backend with the proper amount of shots.
 
@@ -59,20 +286,12 @@ def run_circuit(qc: QuantumCircuit, backend: BackendV2, shots: int, cmap: Coupli
         backend: the backend to run on
         shots:  the amount of shots
         cmap:  the coupling map needed for the 81-qubit circuit
+        pm:  the pass manager to transpile with. A new one is generated if not given
 
     Returns:
         returns the counts variable form the job result.
     """
-    pm = generate_preset_pass_manager(backend=backend, optimization_level=3, coupling_map=cmap)
-    isa_circuit = pm.run(qc)
-    sampler = SamplerV2(mode=backend)
-    job = sampler.run([isa_circuit], shots=shots)
-    result = job.result()
-    try:
-        counts = getattr(result[0].data, qc.cregs[0].name, None).get_counts()
-    except AttributeError:
-        raise SystemError("Empty or invalid result..")  # Handle this?
-    return counts
+    return run_circuits([qc], backend, [shots], cmap=cmap, pm=pm)[0]
 
 
 def get_active_qubits(qc: QuantumCircuit) -> list[int]:
@@ -121,6 +340,8 @@ class QuantumTicTacToe:
             max_controlled_angle: float,
             max_turns: int,
             ultimate: bool,
+            optimization_level: int = 1,
+            circuit_memoization_size: int = 16,
     ):
         """Create the game.
 
@@ -130,6 +351,8 @@ class QuantumTicTacToe:
             max_controlled_angle: max. angle for controlled rotation move
             max_turns: max. number of turns between collapses
             ultimate: whether to create ultimate version
+            optimization_level: transpiler optimization level. The circuits are small, so heavy optimization does not pay off
+            circuit_memoization_size: max. number of transpiled circuits to keep for reuse
         """
 
         self._ultimate = ultimate
@@ -137,11 +360,28 @@ class QuantumTicTacToe:
         self._n_boards = 9 if ultimate else 1
 
         self._backend = backend
+        # results of a noiseless simulator can be computed directly
+        self._ideal_simulator = is_ideal_simulator(backend)
 
+        # empty circuit, copied whenever the circuit is cleared
         if self._backend.name == "aer_simulator_matrix_product_state":
-            self._qc = QuantumCircuit(self._n_bits, self._n_bits)
+            self._empty_qc = QuantumCircuit(self._n_bits, self._n_bits)
         else:
-            self._qc = QuantumCircuit(self._n_bits)
+            self._empty_qc = QuantumCircuit(self._n_bits)
+
+        # pass manager, reused for every circuit run
+        self._pm = generate_preset_pass_manager(
+            backend=self._backend,
+            optimization_level=optimization_level,
+            coupling_map=(
+                fully_connected_81_coupling()
+                if self._backend.name == "aer_simulator_matrix_product_state"
+                else None
+            ),
+        )
+        # transpiled circuit templates by structure, least recently used first
+        self._isa_cache = {}
+        self._isa_cache_size = circuit_memoization_size
 
         self._max_angle = max_angle
         self._max_controlled_angle = max_controlled_angle
@@ -160,8 +400,19 @@ class QuantumTicTacToe:
     def reset(self) -> None:
         """Reset game."""
 
+        # clear circuit
+        self._qc = self._empty_qc.copy_empty_like()
+        # whether the circuit contains controlled rotations
+        self._has_entangling = False
+
         # initialise boards
-        self._boards = [[State.EMPTY for _ in range(9)] for _ in range(self._n_boards)]
+        self._boards = np.full(self._n_bits, State.EMPTY, dtype=np.uint8)
+        # boards as lists of states, cleared when a cell changes
+        self._board_cache = {}
+        # number of empty cells per board
+        self._n_empty = [9 for _ in range(self._n_boards)]
+        # number of empty or entangled cells per board
+        self._n_unmeasured = [9 for _ in range(self._n_boards)]
         # number of turns since last collapse
         self._turns = 0
         # control qubit position
@@ -170,19 +421,27 @@ class QuantumTicTacToe:
         # a turn can have multiple moves (e.g., rotation with 2 qubits)
         self._moves_left_in_turn = 0
         # qubits that have been touched in current turn
-        self._touched = [set() for _ in self._boards]
+        self._touched = [set() for _ in range(self._n_boards)]
         # board wins
         self._board_wins = [State.EMPTY for _ in range(9)]
+        # indices of the boards that have ended
+        self._finished_boards = set()
+        # winner of the game
+        self._winner = State.EMPTY
         # cells to measure
         self._active_cells = [set() for _ in range(self._n_boards)]
-        # entangled boards. board_id: set of entangled boards
-        self._entangled_boards = {i: set() for i in range(self._n_boards)}
+        # entangled boards as a union-find forest. parent and rank of each board
+        self._board_parent = [i for i in range(self._n_boards)]
+        self._board_rank = [0 for _ in range(self._n_boards)]
         # available boards
         self._available_boards = {i for i in range(self._n_boards)}
         # state vectors
-        self._state_vectors = [
-            [[0, 0, 1] for _ in range(9)] for _ in range(self._n_boards)
-        ]
+        self._state_vectors = np.tile([0.0, 0.0, 1.0], (self._n_boards, 9, 1))
+        # available moves, boards, cells and cell counts, cleared whenever they can change
+        self._available_moves_cache = {}
+        self._available_boards_cache = {}
+        self._available_cells_cache = {}
+        self._available_counts_cache = {}
 
     def has_control(self) -> bool:
         """Check if control qubit has been set.
@@ -219,10 +478,13 @@ class QuantumTicTacToe:
             list of board indices that can be used with `move`
         """
 
-        # filter out boards that cannot be used with current move
-        return list(
-            {i for i in self._available_boards if self.count_avialable_cells(i, move)}
-        )
+        if move not in self._available_boards_cache:
+            # filter out boards that cannot be used with current move
+            self._available_boards_cache[move] = list(
+                {i for i in self._available_boards if self.count_avialable_cells(i, move)}
+            )
+
+        return self._available_boards_cache[move]
 
     def available_cells(self, board: int, move: Move) -> list[int]:
         """Get the indices of available cells on board `board` for `move`.
@@ -235,16 +497,23 @@ class QuantumTicTacToe:
             list of available cells on board `board`
         """
 
-        allowed = [State.EMPTY]
-        # allow entangled cells if move is not z-rotation
-        if move != Move.RZ:
-            allowed.append(State.ENTANGLED)
+        key = (board, move)
+
+        if key not in self._available_cells_cache:
+            states = self._boards[_SLICE_OF[board]]
+
+            allowed = states == State.EMPTY
+            # allow entangled cells if move is not z-rotation
+            if move != Move.RZ:
+                allowed |= states == State.ENTANGLED
 
-        return [
-            i
-            for i, state in enumerate(self._boards[board])
-            if state in allowed and i not in self._touched[board]
-        ]
+            self._available_cells_cache[key] = [
+                i
+                for i in np.flatnonzero(allowed).tolist()
+                if i not in self._touched[board]
+            ]
+
+        return self._available_cells_cache[key]
 
     def available_moves(self, moves: list[Move]) -> list[Move]:
         """Filter available moves from a list of moves.
@@ -256,18 +525,22 @@ class QuantumTicTacToe:
             available moves
         """
 
-        allowed = []
+        key = tuple(moves)
+        if key not in self._available_moves_cache:
+            allowed = []
 
-        for move in moves:
-            available_boards = self.available_boards(move)
-            n_empty = sum(
-                [self.count_avialable_cells(board, move) for board in available_boards]
-            )
+            for move in moves:
+                # count available cells only until there are enough for the move
+                n_empty = 0
+                for board in self.available_boards(move):
+                    n_empty += self.count_avialable_cells(board, move)
+                    if n_empty >= move.min_empty:
+                        allowed.append(move)
+                        break
 
-            if n_empty >= move.min_empty:
-                allowed.append(move)
+            self._available_moves_cache[key] = allowed
 
-        return allowed
+        return self._available_moves_cache[key]
 
     def count_avialable_cells(self, board: int, move: Move) -> int:
         """Get the number of available cells on board `board` for `move`.
@@ -280,7 +553,22 @@ class QuantumTicTacToe:
             number of empty cells on board `board` for `move`
         """
 
-        return len(self.available_cells(board, move))
+        key = (board, move)
+
+        if key not in self._available_counts_cache:
+            touched = self._touched[board]
+
+            # touched cells are never measured, only subtract the empty ones for z-rotation
+            if move == Move.RZ:
+                count = self._n_empty[board] - sum(
+                    1 for cell in touched if self._cell(board, cell) == State.EMPTY
+                )
+            else:
+                count = self._n_unmeasured[board] - len(touched)
+
+            self._available_counts_cache[key] = count
+
+        return self._available_counts_cache[key]
 
     def board(self, i: int) -> list[State]:
         """Get the board at index `i`.
@@ -295,7 +583,24 @@ class QuantumTicTacToe:
         if i == -1:
             return self._board_wins
 
-        return self._boards[i]
+        if i not in self._board_cache:
+            self._board_cache[i] = [
+                State(state) for state in self._boards[_SLICE_OF[i]].tolist()
+            ]
+        return self._board_cache[i]
+
+    def board_rows(self, boards: list[int], row: int) -> list[list[State]]:
+        """Get row `row` of each board in `boards`.
+
+        Args:
+            boards: board indices. -1 for the big board
+            row: row index
+
+        Returns:
+            row of each board
+        """
+
+        return [self.board(i)[3 * row : 3 * row + 3] for i in boards]
 
     def collapse(self, board: int | None = None) -> set[int]:
         """Collapse `board`.
@@ -312,106 +617,106 @@ class QuantumTicTacToe:
         if board is None:
             boards = {i for i in range(self._n_boards)}
         else:
-            # get boards to collapse
-            boards = set()
-            to_check = [board]
-            while len(to_check):
-                b = to_check.pop()
-
-                if b in boards:
-                    continue
-                boards.add(b)
+            # get boards entangled with `board`
+            root = self._find_board(board)
+            boards = {b for b in range(self._n_boards) if self._find_board(b) == root}
 
-                for entangled_board in self._entangled_boards[b]:
-                    to_check.append(entangled_board)
-                self._entangled_boards[b].clear()
+        # collapsed boards are no longer entangled
+        for b in boards:
+            self._board_parent[b] = b
+            self._board_rank[b] = 0
 
         results = {}
 
-        cmap = fully_connected_81_coupling()
+        # without controlled rotations every qubit is independent - sample them from their state vectors.
+        # only on a noiseless simulator, other backends have to run the circuit
+        if (
+            self._ideal_simulator
+            and self._backend.name != "aer_simulator_matrix_product_state"
+            and not self._has_entangling
+        ):
+            results = self._sample_product_state(boards)
 
         # measure only active cells
+        indices = []
         for b, cells in enumerate(self._active_cells):
             if b not in boards:
                 continue
-            for c in cells:
-                index = b * 9 + c
-                qcs["symbol"].h(index)
-                if self._backend.name == "aer_simulator_matrix_product_state":
-                    qcs["exist"].measure(index, index)
-                    qcs["symbol"].measure(index, index)
+            indices.extend(_QUBIT_OF[b][c] for c in cells)
             cells.clear()
 
-        # run circuit
-        for key, val in qcs.items():
+        # add the gates for all cells at once
+        if indices:
+            qcs["symbol"].h(indices)
             if self._backend.name == "aer_simulator_matrix_product_state":
-                counts = run_circuit(qc=val, backend=self._backend, shots=1, cmap=cmap)
-                results[key] = max(counts, key=counts.get)
-            else:
-                # Maybe optimize that we only run the x-basis for the qubits that are 1 in the z-basis?
-                result_string = ["0"] * (81 if self._ultimate else 9)
-                dag = circuit_to_dag(val)
-                seperated = dag.separable_circuits(remove_idle_qubits=False)
-                for i in range(len(seperated)):
-                    qc = dag_to_circuit(seperated[i])
-                    active_qubits = get_active_qubits(qc)
-                    new_qc = remove_idle_qubits(qc)
-                    if new_qc.num_qubits > 0:
-                        new_qc.measure_active()
-                        # We can change the amount of shots if we want...
-                        counts = run_circuit(qc=new_qc, backend=self._backend, shots=2 ** (new_qc.num_qubits + 3))
-                        bitstring = get_fair_bitstring(counts, 0.05, 2 ** (new_qc.num_qubits + 3))[::-1]
-                        for j in range(len(active_qubits)):
-                            result_string[active_qubits[j]] = bitstring[j]
-                results[key] = ''.join(result_string)
+                qcs["exist"].measure(indices, indices)
+                qcs["symbol"].measure(indices, indices)
 
-        # update board
-        for i in range(self._n_bits):
-            board = i // 9
+        if not results:
+            results = {key: "0" * self._n_bits for key in qcs}
 
-            if board not in boards:
-                continue
+            # only the measured cells are needed
+            if indices:
+                results["exist"] = self._run(qcs["exist"], set(indices))
 
-            cell = i % 9
+                # the symbol is only needed for the cells measured to exist
+                exist = {i for i in indices if results["exist"][i] == "1"}
 
-            # reset state vector
-            self._state_vectors[board][cell] = [0, 0, 1]
+                if exist:
+                    results["symbol"] = self._run(qcs["symbol"], exist)
 
-            # position already taken
-            if self._boards[board][cell] in [State.X, State.O]:
-                continue
+        # reset state vectors
+        self._state_vectors[list(boards)] = (0, 0, 1)
 
-            # unmark cell as entangled
-            if self._boards[board][cell] == State.ENTANGLED:
-                self._boards[board][cell] = State.EMPTY
+        # measurement results as 0/1 values indexed by qubit
+        exist_bits, symbol_bits = (
+            (np.frombuffer(results[key].encode(), dtype=np.uint8) - ord("0")).tolist()
+            for key in ("exist", "symbol")
+        )
 
-            # set symbol if measured 1 in z-basis
-            if self._backend.name == "aer_simulator_matrix_product_state":
-                if int(results["exist"][self._n_bits - 1 - i]):
-                    self._boards[board][cell] = (
-                        State.X if int(results["symbol"][self._n_bits - 1 - i]) else State.O
-                    )
-            else:
-                if int(results["exist"][i]):
-                    self._boards[board][cell] = (
-                        State.X if int(results["symbol"][i]) else State.O
-                    )
+        # update board
+        for b in boards:
+            for c, i in enumerate(_QUBIT_OF[b]):
+                state = self._boards[i]
 
-            # reset measured qubit
-            self._qc.reset(i)
+                # position already taken
+                if state in _XO:
+                    continue
 
-        # reset whole circuit if collapsed whole board
-        if board is None:
-            if self._backend.name == "aer_simulator_matrix_product_state":
-                self._qc = QuantumCircuit(self._n_bits, self._n_bits)
-            else:
-                self._qc = QuantumCircuit(self._n_bits)
+                # unmark cell as entangled
+                if state == State.ENTANGLED:
+                    self._set_cell(b, c, State.EMPTY)
 
-        self._touched = [set() for _ in self._boards]
+                # set symbol if measured 1 in z-basis
+                if exist_bits[i]:
+                    self._set_cell(b, c, State.X if symbol_bits[i] else State.O)
 
-        # update big board
-        for i, b in enumerate(self._boards):
-            self._board_wins[i] = self._check_win(b)
+        # reset whole circuit if collapsed whole board
+        if board is None:
+            self._qc = self._empty_qc.copy_empty_like()
+            self._has_entangling = False
+        # otherwise drop the gates of the collapsed boards, their qubits are back in |0>.
+        # they are not entangled with other boards, so the rest of the circuit stays the same
+        elif indices:
+            collapsed_qubits = {self._qc.qubits[i] for b in boards for i in _QUBIT_OF[b]}
+            qc = self._qc.copy_empty_like()
+            for instruction in self._qc.data:
+                if collapsed_qubits.isdisjoint(instruction.qubits):
+                    qc.append(instruction)
+            self._qc = qc
+            self._has_entangling = any(len(instruction.qubits) > 1 for instruction in qc.data)
+
+        for touched in self._touched:
+            touched.clear()
+
+        # update big board - only collapsed boards can change
+        for i in boards:
+            winner = self._check_cell_board(i)
+            self._board_wins[i] = winner
+            if winner != State.EMPTY:
+                self._finished_boards.add(i)
+
+        self._winner = self._check_big_board() if self._ultimate else self._board_wins[0]
 
         self._turns = -1
         self._increase_turns()
@@ -429,9 +734,7 @@ class QuantumTicTacToe:
         """
         # check big board if no board selected
         if board is None:
-            if self._ultimate:
-                return self._check_win(self._board_wins)
-            return self._board_wins[0]
+            return self._winner
         return self._board_wins[board]
 
     def rotate(
@@ -452,19 +755,19 @@ class QuantumTicTacToe:
             set of collapsed board indices
         """
 
-        assert board < len(self._boards), "Invalid board index"
+        assert board < self._n_boards, "Invalid board index"
         assert cell < 9, "Invalid cell index"
         assert abs(angle) <= self._max_angle, "Angle too large"
         assert n > 0, "Number of qubits must be at least 1"
-        assert self._boards[board][cell] not in [State.X, State.O], (
+        assert self._cell(board, cell) not in _XO, (
             "Cannot rotate non-empty cell"
         )
         if axis == Axis.Z:
-            assert self._boards[board][cell] != State.ENTANGLED, (
+            assert self._cell(board, cell) != State.ENTANGLED, (
                 "Cannot z-rotate entangled cell"
             )
 
-        qubit = board * 9 + cell
+        qubit = _QUBIT_OF[board][cell]
         match axis:
             case Axis.X:
                 self._qc.rx(angle, qubit)
@@ -481,8 +784,8 @@ class QuantumTicTacToe:
         self._moves_left_in_turn -= 1
 
         # rotate state vector
-        self._state_vectors[board][cell] = rotate_vec(
-            self._state_vectors[board][cell], angle, axis
+        self._state_vectors[board, cell] = rotate_vec(
+            self._state_vectors[board, cell], angle, axis
         )
 
         if self._moves_left_in_turn == 0:
@@ -497,14 +800,14 @@ class QuantumTicTacToe:
             cell: cell index
         """
 
-        assert board < len(self._boards), "Invalid board index"
+        assert board < self._n_boards, "Invalid board index"
         assert cell < 9, "Invalid cell index"
-        assert self._boards[board][cell] not in [State.X, State.O], "Cell is not empty"
+        assert self._cell(board, cell) not in _XO, "Cell is not empty"
 
         self._c_board = board
         self._c_cell = cell
 
-        self._boards[board][cell] = State.ENTANGLED
+        self._set_cell(board, cell, State.ENTANGLED)
 
         self._moves_left_in_turn = 1
 
@@ -535,10 +838,10 @@ class QuantumTicTacToe:
             "Control qubit has not been selected"
         )
         assert angle <= self._max_controlled_angle, "Angle too large"
-        assert self._boards[board][cell] not in [State.X, State.O], "Cell is not empty"
+        assert self._cell(board, cell) not in _XO, "Cell is not empty"
 
-        c_qubit = self._c_board * 9 + self._c_cell
-        t_qubit = board * 9 + cell
+        c_qubit = _QUBIT_OF[self._c_board][self._c_cell]
+        t_qubit = _QUBIT_OF[board][cell]
 
         match axis:
             case Axis.X:
@@ -548,9 +851,10 @@ class QuantumTicTacToe:
             case Axis.Z:
                 self._qc.crz(angle, c_qubit, t_qubit)
 
+        self._has_entangling = True
+
         # add to entangled boards
-        self._entangled_boards[board].add(self._c_board)
-        self._entangled_boards[self._c_board].add(board)
+        self._union_boards(board, self._c_board)
 
         # reset control qubit index
         self._c_board = -1
@@ -559,18 +863,18 @@ class QuantumTicTacToe:
         self._moves_left_in_turn = 0
 
         # mark cell as entangled
-        self._boards[board][cell] = State.ENTANGLED
+        self._set_cell(board, cell, State.ENTANGLED)
 
         self._touch_cell(board, cell)
 
         # rotate state vector
-        self._state_vectors[board][cell] = rotate_vec(
-            self._state_vectors[board][cell], angle, axis
+        self._state_vectors[board, cell] = rotate_vec(
+            self._state_vectors[board, cell], angle, axis
         )
 
         return self._increase_turns()
 
-    def get_statevector(self, board, cell) -> list[int]:
+    def get_statevector(self, board, cell) -> list[float]:
         """Get the state vector of `cell` on `board`.
 
         Args:
@@ -581,15 +885,184 @@ class QuantumTicTacToe:
             state vector
         """
 
-        if self._boards[board][cell] == State.ENTANGLED:
+        if self._cell(board, cell) == State.ENTANGLED:
             return [0, 0, 0]
 
-        return self._state_vectors[board][cell]
+        return self._state_vectors[board, cell].tolist()
+
+    @property
+    def circuit(self) -> QuantumCircuit:
+        """Circuit of the game."""
+
+        return self._qc
 
     def circuit_string(self):
         """Get string representation of the circuit."""
 
-        return self._qc.draw()
+        return self.circuit.draw()
+
+    def _run(self, qc: QuantumCircuit, qubits: set[int] | None = None) -> str:
+        """Run `qc` and get the measurement result of every qubit.
+
+        Args:
+            qc: circuit to run
+            qubits: qubit indices whose results are needed. None if all are needed
+
+        Returns:
+            bitstring indexed by qubit
+        """
+
+        if self._backend.name == "aer_simulator_matrix_product_state":
+            counts = run_circuit(qc=qc, backend=self._backend, shots=1, pm=self._pm)
+            # classical bits are in reverse order
+            return max(counts, key=counts.get)[::-1]
+
+        result_string = ["0"] * self._n_bits
+
+        # small sub-circuits are cheaper to simulate directly than to send to the simulator.
+        # only if noiseless, noise would be ignored
+        exact = self._ideal_simulator
+
+        # (counts, active qubits, total) of every sampled sub-circuit
+        sampled = []
+
+        # collect the sub-circuits, so they can be run in one job
+        sub_circuits = []
+        sub_qubits = []
+        shots = []
+
+        dag = circuit_to_dag(qc)
+        seperated = dag.separable_circuits(remove_idle_qubits=False)
+        for i in range(len(seperated)):
+            sub_qc = dag_to_circuit(seperated[i])
+            active_qubits = get_active_qubits(sub_qc)
+            # skip sub-circuits with no needed results
+            if qubits is not None and qubits.isdisjoint(active_qubits):
+                continue
+            new_qc = remove_idle_qubits(sub_qc)
+            if new_qc.num_qubits > 0:
+                if exact and new_qc.num_qubits <= _EXACT_MAX_QUBITS:
+                    probabilities = Statevector(new_qc).probabilities_dict()
+                    sampled.append((probabilities, active_qubits, 1))
+                    continue
+
+                new_qc.measure_active()
+                sub_circuits.append(new_qc)
+                sub_qubits.append(active_qubits)
+                # We can change the amount of shots if we want...
+                shots.append(2 ** (new_qc.num_qubits + 3))
+
+        if sub_circuits:
+            all_counts = run_circuits(
+                qcs=sub_circuits,
+                backend=self._backend,
+                shots=shots,
+                pm=self._pm,
+                isa_cache=self._isa_cache,
+                isa_cache_size=self._isa_cache_size,
+            )
+
+            sampled.extend(zip(all_counts, sub_qubits, shots))
+
+        for counts, active_qubits, n in sampled:
+            bitstring = get_fair_bitstring(counts, 0.05, n)[::-1]
+            for j in range(len(active_qubits)):
+                result_string[active_qubits[j]] = bitstring[j]
+
+        return "".join(result_string)
+
+    def _cell(self, board: int, cell: int) -> State:
+        """Get the state of `cell` on `board`.
+
+        Args:
+            board: board index
+            cell: cell index
+
+        Returns:
+            cell state
+        """
+
+        return State(int(self._boards[_QUBIT_OF[board][cell]]))
+
+    def _set_cell(self, board: int, cell: int, state: State) -> None:
+        """Set the state of `cell` on `board`.
+
+        Keeps the number of empty and unmeasured cells up to date.
+
+        Args:
+            board: board index
+            cell: cell index
+            state: new cell state
+        """
+
+        old = self._cell(board, cell)
+
+        self._n_empty[board] += (state == State.EMPTY) - (old == State.EMPTY)
+        self._n_unmeasured[board] += (state in _UNMEASURED) - (old in _UNMEASURED)
+
+        self._boards[_QUBIT_OF[board][cell]] = state
+        self._board_cache.pop(board, None)
+
+    def _sample_product_state(self, boards: set[int]) -> dict[str, str]:
+        """Sample the measurement results of `boards` from the state vectors.
+
+        Only valid if the circuit contains no controlled rotations.
+
+        Args:
+            boards: board indices to sample
+
+        Returns:
+            bitstrings for the "exist" and "symbol" measurements
+        """
+
+        exist = ["0"] * self._n_bits
+        symbol = ["0"] * self._n_bits
+
+        for b in boards:
+            for c in range(9):
+                x, _, z = self._state_vectors[b, c]
+                # probability of |1> in z-basis and |-> in x-basis
+                exist[_QUBIT_OF[b][c]] = sample_qubit((1 - z) / 2, 0.05)
+                symbol[_QUBIT_OF[b][c]] = sample_qubit((1 - x) / 2, 0.05)
+
+        return {"exist": "".join(exist), "symbol": "".join(symbol)}
+
+    def _find_board(self, board: int) -> int:
+        """Find the representative of the boards entangled with `board`.
+
+        Args:
+            board: board index
+
+        Returns:
+            representative board index
+        """
+
+        parent = self._board_parent
+        while parent[board] != board:
+            # path halving
+            parent[board] = parent[parent[board]]
+            board = parent[board]
+        return board
+
+    def _union_boards(self, a: int, b: int) -> None:
+        """Mark boards `a` and `b` as entangled.
+
+        Args:
+            a: board index
+            b: board index
+        """
+
+        a = self._find_board(a)
+        b = self._find_board(b)
+        if a == b:
+            return
+
+        # attach the shorter tree to the taller one
+        if self._board_rank[a] < self._board_rank[b]:
+            a, b = b, a
+        self._board_parent[b] = a
+        if self._board_rank[a] == self._board_rank[b]:
+            self._board_rank[a] += 1
 
     def _touch_cell(self, board: int, cell: int) -> None:
         """Add cell to list of active cells.
@@ -606,6 +1079,8 @@ class QuantumTicTacToe:
         if len(self._available_boards) != 1:
             self._available_boards.remove(board)
 
+        self._clear_available_cache()
+
     def _increase_turns(self) -> set[int]:
         """Increase the number of moves.
 
@@ -624,76 +1099,71 @@ class QuantumTicTacToe:
             collapsed = self.collapse()
 
         # get available boards
-        self._available_boards = {
-            cell
-            for touched in self._touched
-            for cell in touched
-            if cell == 0 or self._ultimate
-        }
+        self._available_boards.clear()
+        for touched in self._touched:
+            self._available_boards.update(
+                cell for cell in touched if cell == 0 or self._ultimate
+            )
+            touched.clear()
 
         # filter out finished boards
-        finished = {
-            i for i, state in enumerate(self._board_wins) if state != State.EMPTY
-        }
+        finished = self._finished_boards
 
-        self._available_boards = self._available_boards.difference(finished)
+        self._available_boards.difference_update(finished)
 
         # enable all unfinished boards if no boards available
         if len(self._available_boards) == 0:
-            self._available_boards = {i for i in range(self._n_boards)}.difference(
-                finished
+            self._available_boards.update(
+                i for i in range(self._n_boards) if i not in finished
             )
 
-        self._touched = [set() for _ in self._boards]
+        self._clear_available_cache()
 
         return collapsed
 
-    def _check_win(self, board: list[State]) -> State:
-        """Check whether someone has won a board.
+    def _clear_available_cache(self) -> None:
+        """Clear the cached available moves, boards, cells and cell counts."""
+
+        self._available_moves_cache.clear()
+        self._available_boards_cache.clear()
+        self._available_cells_cache.clear()
+        self._available_counts_cache.clear()
+
+    def _check_cell_board(self, board: int) -> State:
+        """Check whether someone has won a board of cells.
 
         Args:
-            board: board to check
+            board: board index
+
+        Returns:
+            winner of the board. `State.DRAW` iff draw. `State.EMPTY` iff board has not ended.
+        """
+
+        states = self._boards[_SLICE_OF[board]]
+
+        x_mask = int(_CELL_BITS[states == State.X].sum())
+        o_mask = int(_CELL_BITS[states == State.O].sum())
+        full = not (states == State.EMPTY).any()
+
+        return _winner(x_mask, o_mask, full)
+
+    def _check_big_board(self) -> State:
+        """Check whether someone has won the big board.
 
         Returns:
             winner of the game. `State.DRAW` iff draw. `State.EMPTY` iff game has not ended.
         """
-        winner = State.EMPTY
 
+        x_mask = 0
+        o_mask = 0
         full = True
 
-        combinations = [
-            # horisontal
-            (0, 1, 2),
-            (3, 4, 5),
-            (6, 7, 8),
-            # vertrical
-            (0, 3, 6),
-            (1, 4, 7),
-            (2, 5, 8),
-            # diagonal
-            (0, 4, 8),
-            (2, 4, 6),
-        ]
-
-        for comb in combinations:
-            row = (board[comb[0]], board[comb[1]], board[comb[2]])
-
-            # check if all full
-            full = full and all(state != State.EMPTY for state in row)
-
-            current_winner = State.EMPTY
-
-            if row == (State.X, State.X, State.X):
-                current_winner = State.X
-            elif row == (State.O, State.O, State.O):
-                current_winner = State.O
-
-            if current_winner != State.EMPTY:
-                if winner == State.EMPTY:
-                    winner = current_winner
-                elif winner != current_winner:
-                    return State.DRAW
-
-        if winner == State.EMPTY:
-            return State.DRAW if full else State.EMPTY
-        return winner
+        for i, state in enumerate(self._board_wins):
+            if state == State.X:
+                x_mask |= 1 << i
+            elif state == State.O:
+                o_mask |= 1 << i
+            elif state == State.EMPTY:
+                full = False
+
+        return _winner(x_mask, o_mask, full)
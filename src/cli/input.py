@@ -1,3 +1,24 @@
+import math
+from collections.abc import Set
+
+
+def _parse_int(s: str) -> int | None:
+    """Parse integer with an optional sign.
+
+    Args:
+        s: string to parse
+
+    Returns:
+        integer iff `s` is an integer. None otherwise
+    """
+
+    s = s.strip()
+    digits = s[1:] if s[:1] in ("+", "-") else s
+    if not digits.isdecimal():
+        return None
+    return int(s)
+
+
 def get_int(min: int, max: int, prompt: str, error: str) -> int:
     """Get integer from stdin in range [`min`, `max`].
 
@@ -12,13 +33,10 @@ def get_int(min: int, max: int, prompt: str, error: str) -> int:
     """
 
     while True:
-        try:
-            val = int(input(prompt))
-            if val < min or val > max:
-                raise ValueError
+        val = _parse_int(input(prompt))
+        if val is not None and min <= val <= max:
             return val
-        except ValueError:
-            print(error)
+        print(error)
 
 
 def get_float(min: float, max: float, prompt: str, error: str) -> float:
@@ -37,33 +55,29 @@ def get_float(min: float, max: float, prompt: str, error: str) -> float:
     while True:
         try:
             val = float(input(prompt))
-            if val < min or val > max:
-                raise ValueError
-            return val
         except ValueError:
-            print(error)
+            val = math.nan
+
+        # nan and inf are not valid angles
+        if math.isfinite(val) and min <= val <= max:
+            return val
+        print(error)
 
 
-def get_int_from_list(list: list[int], prompt: str, error: str) -> int:
-    """Get int from stdin that is in `list`.
+def get_int_from_list(allowed: Set[int], prompt: str, error: str) -> int:
+    """Get int from stdin that is in `allowed`.
 
     Args:
-        list: list of allowed values
+        allowed: set of allowed values
         prompt: text to display when asking for input
         error: text to display when invalid input
 
     Returns:
-        int in `list`
+        int in `allowed`
     """
 
     while True:
-        try:
-            i = int(input(prompt))
-
-            if i in list:
-                return i
-
-            raise ValueError
-
-        except ValueError:
-            print(error)
+        i = _parse_int(input(prompt))
+        if i in allowed:
+            return i
+        print(error)
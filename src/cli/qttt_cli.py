@@ -1,12 +1,113 @@
+import functools
+import io
 import math
+import sys
+from typing import TextIO
 from backend.quantum_tic_tac_toe import Axis, QuantumTicTacToe, State, Move
+from backend.enums import ROTATION_OF_AXIS, CONTROLLED_ROTATION_OF_AXIS
 from qiskit.providers import BackendV2
 from cli.input import get_int, get_float, get_int_from_list
 
+_VERTICAL = "\u2502"
+_DOUBLE_VERTICAL = "\u2551"
+_HORIZONTAL = "\u2500" * 3
+# gap between the rows of neighbouring boards
+_BOARD_GAP = f"   {_DOUBLE_VERTICAL}"
+# padded symbol of each cell state
+_CELL_DISPLAY = {state: f" {state} " for state in State}
+# superscript cell numbers
+_SUP_NUMBERS = (
+    "\u00b9",
+    "\u00b2",
+    "\u00b3",
+    "\u2074",
+    "\u2075",
+    "\u2076",
+    "\u2077",
+    "\u2078",
+    "\u2079",
+)
+# horizontal separator for ultimate board
+_BIG_SEPARATOR = "\u256c".join(["\u2550" * 16] * 3) + "\n"
+
+
+def _row_separator(row: int, big: bool) -> str:
+    """Build board row separator.
+
+    Args:
+        row: row number
+        big: whether printing big board
+
+    Returns:
+        separator line
+    """
+
+    horizontal = _HORIZONTAL if (row + 1) % 3 else " " * 3
+
+    cell_row = row % 3
+
+    parts = []
+
+    # for each board
+    for i in range(3 if big else 1):
+        parts.append("  ")  # cell
+
+        # horizontal bar and number of each cell
+        for j in range(3):
+            parts.append(horizontal)
+            parts.append(_SUP_NUMBERS[3 * cell_row + j])
+
+        # double vertical between subboards
+        if big and i < 2:
+            parts.append(f"  {_DOUBLE_VERTICAL}")
+
+    parts.append("\n")
+    return "".join(parts)
+
+
+# row separators never change. [big][row]
+_ROW_SEPARATORS = {
+    big: tuple(_row_separator(row, big) for row in range(3)) for big in (False, True)
+}
+
+
+@functools.cache
+def _index_prompt(name: str, available: tuple[int, ...]) -> tuple[frozenset[int], str, str]:
+    """Build the prompt for choosing one of the `available` indices.
+
+    The same indices are often available again, so the prompts are cached.
+
+    Args:
+        name: what the index is for, e.g. "board"
+        available: available indices
+
+    Returns:
+        (1-based available numbers, prompt, error)
+    """
+
+    available_from_one = [i + 1 for i in available]
+
+    return (
+        frozenset(available_from_one),
+        f"Enter {name} number {available_from_one}: ",
+        f"{name.capitalize()} number must be in {available_from_one}",
+    )
+
 
 class QtttCLI:
     """CLI version of Quantum Tic-Tac-Toe."""
 
+    # move types. move: function that makes the move
+    _MOVE_CALLBACKS = {
+        Move.RX: lambda cli: cli._rotate(Axis.X),
+        Move.RY: lambda cli: cli._rotate(Axis.Y),
+        Move.RZ: lambda cli: cli._rotate(Axis.Z),
+        Move.CRX: lambda cli: cli._rotate_controlled(Axis.X),
+        Move.CRY: lambda cli: cli._rotate_controlled(Axis.Y),
+        Move.CRZ: lambda cli: cli._rotate_controlled(Axis.Z),
+        Move.COLLAPSE: lambda cli: cli._collapse(),
+    }
+
     def __init__(self, ultimate: bool, moves: list[Move], backend: BackendV2):
         """Create the game.
 
@@ -16,21 +117,18 @@ class QtttCLI:
             backend: backend to use for running the circuit
         """
 
-        # initialise move types
-        self._move_callbacks = {
-            Move.RX: lambda: self._rotate(Axis.X),
-            Move.RY: lambda: self._rotate(Axis.Y),
-            Move.RZ: lambda: self._rotate(Axis.Z),
-            Move.CRX: lambda: self._rotate_controlled(Axis.X),
-            Move.CRY: lambda: self._rotate_controlled(Axis.Y),
-            Move.CRZ: lambda: self._rotate_controlled(Axis.Z),
-            Move.COLLAPSE: self._collapse,
-        }
-
         self._game = QuantumTicTacToe(backend, math.pi / 2, math.pi, 10, ultimate)
         self._moves = moves
         self._ultimate = ultimate
 
+        # move callbacks by the key the player types
+        self._dispatch_by_key = {
+            move.key: functools.partial(self._MOVE_CALLBACKS[move], self) for move in moves
+        }
+
+        # move type prompts by available move keys
+        self._prompt_cache: dict[frozenset[str], str] = {}
+
     def play(self):
         """Play one game."""
 
@@ -38,58 +136,66 @@ class QtttCLI:
         self._game.reset()
 
         while True:
+            # write the whole frame at once
+            out = io.StringIO()
+
             if self._ultimate:
-                print()
-                self._print_board(-1)
+                out.write("\n")
+                self._print_board(-1, out)
 
-            print()
-            self._print_board()
-            print()
+            out.write("\n")
+            self._print_board(out=out)
+            out.write(f"\nIt's {turn}'s turn.\n")
 
-            print(f"It's {turn}'s turn.")
+            sys.stdout.write(out.getvalue())
 
             available_moves = {
                 move.key: move for move in self._game.available_moves(self._moves)
             }
 
             # create prompt
-            prompt = "Select move type: "
-            for i, key in enumerate(available_moves):
-                prompt += f"{available_moves[key].description} [{key}]"
-                if i < len(available_moves) - 1:
-                    prompt += " | "
-            prompt += ": "
+            prompt_key = frozenset(available_moves)
+            if prompt_key not in self._prompt_cache:
+                options = " | ".join(
+                    f"{move.description} [{key}]" for key, move in available_moves.items()
+                )
+                self._prompt_cache[prompt_key] = f"Select move type: {options}: "
+            prompt = self._prompt_cache[prompt_key]
 
             # get move type
             move_str = None
 
             while True:
                 move_str = input(prompt)
-                if move_str not in available_moves.keys():
+                if move_str not in available_moves:
                     print("Invalid move type!")
                 else:
                     break
 
-            collapsed = self._move_callbacks[available_moves[move_str]]()
+            collapsed = self._dispatch_by_key[move_str]()
 
             # draw circuit
             if not collapsed:
-                print()
-                print(self._game.circuit_string())
+                sys.stdout.write(f"\n{self._game.circuit_string()}\n")
 
             # check win if collapsed
             if collapsed:
-                print("\nBoard collapsed\n")
+                out = io.StringIO()
+                out.write("\nBoard collapsed\n\n")
                 winner = self._game.check_win(0)
                 # game ended
                 if winner != State.EMPTY:
-                    self._print_board(-1 if self._ultimate else 0)
-                    print()
+                    self._print_board(-1 if self._ultimate else 0, out)
+                    out.write("\n")
 
                     if winner == State.DRAW:
-                        print("It's a draw.")
+                        out.write("It's a draw.\n")
                     else:
-                        print(f"{winner} has won!")
+                        out.write(f"{winner} has won!\n")
+
+                sys.stdout.write(out.getvalue())
+
+                if winner != State.EMPTY:
                     break
 
             turn = State.X if turn == State.O else State.O
@@ -104,13 +210,7 @@ class QtttCLI:
             whether the board collapsed
         """
 
-        match axis:
-            case Axis.X:
-                move = Move.RX
-            case Axis.Y:
-                move = Move.RY
-            case Axis.Z:
-                move = Move.RZ
+        move = ROTATION_OF_AXIS[axis]
 
         max_n = min(2, self._game.count_avialable_cells(0, move))
 
@@ -124,9 +224,7 @@ class QtttCLI:
 
         remaining_rotation = self._game.max_angle
 
-        used = set()
-
-        collapsed = set()
+        collapsed = False
 
         for _ in range(n):
             # get board index
@@ -146,11 +244,10 @@ class QtttCLI:
             remaining_rotation -= abs(angle)
 
             # add rotation gate
-            collapsed.update(self._game.rotate(board, pos, axis, angle, n))
-
-            used.add(pos)
+            if self._game.rotate(board, pos, axis, angle, n):
+                collapsed = True
 
-        return len(collapsed) != 0
+        return collapsed
 
     def _rotate_controlled(self, axis: Axis) -> bool:
         """Move for controlled rotation.
@@ -162,14 +259,7 @@ class QtttCLI:
             whether the board collapsed
         """
 
-        move = None
-        match axis:
-            case Axis.X:
-                move = Move.CRX
-            case Axis.Y:
-                move = Move.CRY
-            case Axis.Z:
-                move = Move.CRZ
+        move = CONTROLLED_ROTATION_OF_AXIS[axis]
 
         # get control qubit index
         print("Choose control qubit.")
@@ -217,16 +307,7 @@ class QtttCLI:
 
         available = self._game.available_boards(move)
 
-        available_from_one = [i + 1 for i in available]
-
-        return (
-            get_int_from_list(
-                available_from_one,
-                f"Enter board number {available_from_one}: ",
-                f"Board number must be in {available_from_one}",
-            )
-            - 1
-        )
+        return get_int_from_list(*_index_prompt("board", tuple(available))) - 1
 
     def _get_valid_position(self, board: int, move: Move) -> int:
         """Get cell index for `board` from stdin that is allowed for `move`.
@@ -241,49 +322,72 @@ class QtttCLI:
 
         available = self._game.available_cells(board, move)
 
-        # list with 1-based indexing
-        available_from_one = [i + 1 for i in available]
-
-        return (
-            get_int_from_list(
-                available_from_one,
-                f"Enter cell number {available_from_one}: ",
-                f"Cell number must be in {available_from_one}",
-            )
-            - 1
-        )
+        return get_int_from_list(*_index_prompt("cell", tuple(available))) - 1
 
-    def _print_board(self, board: int | None = None):
+    def _print_board(self, board: int | None = None, out: TextIO | None = None):
         """Print the board.
 
         Args:
             board: board index. `None` if printing whole board. `-1` if printing big board for ultimate
+            out: stream to print to. `None` if printing to stdout
         """
 
+        # render the whole board before writing it to stdout
+        buffered = out is None
+        if buffered:
+            out = io.StringIO()
+
         # print 9 boards if ultimate and board index not given
-        big = self._ultimate and board is None
+        if self._ultimate and board is None:
+            self._print_ultimate_board(out)
+        else:
+            self._print_single_board(0 if board is None else board, out)
+
+        if buffered:
+            sys.stdout.write(out.getvalue())
+
+    def _print_single_board(self, board: int, out: TextIO) -> None:
+        """Print one board.
+
+        Args:
+            board: board index. `-1` if printing big board for ultimate
+            out: stream to print to
+        """
+
+        separators = _ROW_SEPARATORS[False]
+
+        for row in range(3):
+            self._print_row(row, board, out)
+            out.write(separators[row])
+
+    def _print_ultimate_board(self, out: TextIO) -> None:
+        """Print all 9 boards of ultimate.
+
+        Args:
+            out: stream to print to
+        """
+
+        separators = _ROW_SEPARATORS[True]
 
         # for row of boards
-        for i in range(3 if big else 1):
+        for i in range(3):
             # for row in board
             for j in range(3):
-                self._print_row(i * 3 + j, board)
-                self._print_row_separator(j, big)
+                self._print_row(i * 3 + j, None, out)
+                out.write(separators[j])
 
-            if big and i < 2:
-                self._print_big_board_separator()
+            if i < 2:
+                out.write(_BIG_SEPARATOR)
 
-    def _print_row(self, row: int, board: int | None):
+    def _print_row(self, row: int, board: int | None, out: TextIO):
         """Print board row.
 
         Args:
             row: row to print
             board: board index to print. `None` if printing all subboards
+            out: stream to print to
         """
 
-        vertical = "\u2502"
-        double_vertical = "\u2551"
-
         # row in board
         cell_row = row % 3
 
@@ -299,84 +403,21 @@ class QtttCLI:
             board_indices = [board]
 
         # list of board rows to print
-        rows = [
-            self._game.board(i)[3 * cell_row : 3 + 3 * cell_row] for i in board_indices
-        ]
+        rows = self._game.board_rows(board_indices, cell_row)
+
+        parts = []
 
         # for each row
         for i in range(len(rows)):
             values = rows[i]
-            print("  ", end="")
+            parts.append("  ")
 
-            # for cell in row
-            for j in range(3):
-                # print cell value
-                print(f" {values[j]} ", end="")
-                # print vertical bar
-                if j < 2:
-                    print(vertical, end="")
+            # cell values separated by vertical bars
+            parts.append(_VERTICAL.join(_CELL_DISPLAY[value] for value in values))
 
-            # print double vertical bar between boards
+            # double vertical bar between boards
             if i < len(rows) - 1:
-                print(f"   {double_vertical}", end="")
-
-        print()
-
-    def _print_row_separator(self, row: int, big: bool) -> None:
-        """Print board row separator.
-
-        Args:
-            row: row number
-            big: whether printing big board
-        """
-
-        numbers = [
-            "\u00b9",
-            "\u00b2",
-            "\u00b3",
-            "\u2074",
-            "\u2075",
-            "\u2076",
-            "\u2077",
-            "\u2078",
-            "\u2079",
-        ]
-        horizontal = "\u2500" * 3 if (row + 1) % 3 else " " * 3
-
-        double_vertical = "\u2551"
-
-        cell_row = row % 3
-
-        # for each board
-        for i in range(3 if big else 1):
-            print("  ", end="")  # cell
-
-            # for each cell
-            for j in range(3):
-                # print horizontal bar
-                print(horizontal, end="")
-                # print number
-                print(numbers[3 * cell_row + j], end="")
-
-            # print double vertical between subboards
-            if big and i < 2:
-                print(f"  {double_vertical}", end="")
-
-        print()
-
-    def _print_big_board_separator(self) -> None:
-        """Print horizontal separator for ultimate board."""
-
-        line = "\u2550" * 16
-        cross = "\u256c"
-
-        # for each board
-        for i in range(3):
-            # print line
-            print(line, end="")
-
-            # print cross
-            if i < 2:
-                print(cross, end="")
+                parts.append(_BOARD_GAP)
 
-        print()
+        parts.append("\n")
+        out.write("".join(parts))
@@ -1,20 +1,74 @@
+import functools
 import math
-from tkinter import Tk, StringVar, DoubleVar, ttk
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from tkinter import Tk, StringVar, DoubleVar, Widget, ttk
 from backend.quantum_tic_tac_toe import QuantumTicTacToe, State, Axis, Move
+from backend.enums import ROTATION_OF_AXIS, CONTROLLED_ROTATION_OF_AXIS
 from gui.widgets.angle_selection import AngleSelection
 from gui.widgets.board import Board
 from gui.widgets.move_selection import MoveSelection
 from gui.widgets.number_selection import NumberSelection
 from qiskit.providers import BackendV2
+from qiskit_aer import AerSimulator
 from gui.partial_circuits import display_circuit_of_sub_board
 from gui.widgets.partial_circuit_selection import PartialCircuitSelection
 
+# milliseconds between checks for a finished move
+_POLL_INTERVAL = 20
+# name of the app theme
+_THEME = "qttt"
+# sub-board numbers accepted for the partial circuit
+_VALID_SUB_BOARDS = frozenset("123456789")
+# rotation axis of each rotation move
+_AXIS_OF_MOVE = {move: move.get_axis() for move in Move if move != Move.COLLAPSE}
+
+
+@functools.cache
+def _default_backend() -> BackendV2:
+    """Get the simulator shared by all apps without a backend.
+
+    The options of the shared simulator must not be changed.
+
+    Returns:
+        non-noisy matrix product state simulator
+    """
+
+    return AerSimulator(method="matrix_product_state")
+
+
+def _install_theme() -> None:
+    """Create the app theme from the current one and use it.
+
+    The theme is created only once per Tk interpreter.
+    """
+
+    style = ttk.Style()
+
+    if _THEME not in style.theme_names():
+        style.theme_create(
+            _THEME,
+            parent=style.theme_use(),
+            settings={
+                ".": {"configure": {"background": "#E0E0E0"}},
+                "TButton": {"configure": {"background": "#F5F5F5"}},
+                "TopInfo.TLabel": {"configure": {"font": ("Roboto", 20)}},
+            },
+        )
+
+    style.theme_use(_THEME)
+
 
 class App:
     """Main application."""
 
     def __init__(
-        self, root: Tk, ultimate: bool, moves: list[Move], backend: BackendV2
+        self,
+        root: Tk,
+        ultimate: bool,
+        moves: list[Move],
+        backend: BackendV2 | None = None,
+        circuit_memoization_size: int = 16,
     ) -> None:
         """Create application.
 
@@ -22,22 +76,38 @@ class App:
             root: root widget
             ultimate: whether to create ultimate version
             moves: list of allowed moves
-            backend: backend for running quantum circuit
+            backend: backend for running quantum circuit. The shared simulator is used if not given
+            circuit_memoization_size: max. number of transpiled circuits to keep for reuse
         """
 
+        self._root = root
         self._moves = moves
         self._ultimate = ultimate
 
-        # style
-        style = ttk.Style()
-        style.configure("TopInfo.TLabel", font=("Roboto", 20))
-        style.configure(".", background="#E0E0E0")
-        style.configure("TButton", background="#F5F5F5")
+        # moves run on a worker thread, so the backend does not block the main loop
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        # move being made. None if no move running
+        self._move_future: Future | None = None
+
+        _install_theme()
 
         # create game
-        self._game = QuantumTicTacToe(backend, math.pi / 2, math.pi, 10, ultimate)
+        if backend is None:
+            backend = _default_backend()
+
+        self._game = QuantumTicTacToe(
+            backend,
+            math.pi / 2,
+            math.pi,
+            10,
+            ultimate,
+            circuit_memoization_size=circuit_memoization_size,
+        )
         self._turn = State.X
 
+        # info text of each turn
+        self._turn_strings = {turn: f"It's {turn}'s turn" for turn in (State.X, State.O)}
+
         # vertical padding for elements
         row_padding = "0 10"
 
@@ -61,7 +131,7 @@ class App:
 
         # create info label
         self._info_text = StringVar()
-        self._info_text.set("It's X's turn")
+        self._info_text.set(self._turn_strings[State.X])
 
         info_label = ttk.Label(
             mainframe,
@@ -79,18 +149,28 @@ class App:
 
         # move callbacks
         self._move_callbacks = {
-            Move.RX: lambda: self._rotate(Axis.X),
-            Move.RY: lambda: self._rotate(Axis.Y),
-            Move.RZ: lambda: self._rotate(Axis.Z),
-            Move.CRX: lambda: self._rotate_controlled(Axis.X),
-            Move.CRY: lambda: self._rotate_controlled(Axis.Y),
-            Move.CRZ: lambda: self._rotate_controlled(Axis.Z),
+            Move.RX: functools.partial(self._rotate, Axis.X),
+            Move.RY: functools.partial(self._rotate, Axis.Y),
+            Move.RZ: functools.partial(self._rotate, Axis.Z),
+            Move.CRX: functools.partial(self._rotate_controlled, Axis.X),
+            Move.CRY: functools.partial(self._rotate_controlled, Axis.Y),
+            Move.CRZ: functools.partial(self._rotate_controlled, Axis.Z),
             Move.COLLAPSE: self._collapse,
         }
 
+        # the widgets of the buttons row are stacked, the shown one is raised to the top
+        self._button_stack = ttk.Frame(mainframe)
+        self._button_stack.grid(row=buttons_row, column=0, sticky="NSEW")
+        self._button_stack.rowconfigure(0, weight=1)
+        self._button_stack.columnconfigure(0, weight=1)
+        # page of each widget in the stack. None for the empty page
+        self._button_pages = {None: self._create_button_page()}
+        self._shown_buttons = None
+
         # create move type selection widget
+        page = self._create_button_page()
         self._move_selection = MoveSelection(
-            mainframe,
+            page,
             {
                 move: callback
                 for move, callback in self._move_callbacks.items()
@@ -99,22 +179,14 @@ class App:
             cols=2,
             padding=row_padding,
         )
-        self._move_selection.grid(row=buttons_row, column=0, sticky="S")
-
-        # create number of qubits selection widget
-        self._number_selection = NumberSelection(
-            mainframe, 2, 2, self._select_number_of_qubits, padding=row_padding
-        )
-        self._number_selection.grid(row=buttons_row, column=0, sticky="S")
-        self._number_selection.grid_forget()
+        self._move_selection.grid(row=0, column=0, sticky="S")
+        self._button_pages[self._move_selection] = page
 
-        # create angle selection widget
+        # number of qubits and angle selection widgets are created when first needed
+        self._row_padding = row_padding
+        self._number_selection: NumberSelection | None = None
+        self._angle_selection: AngleSelection | None = None
         self._angle = DoubleVar()
-        self._angle_selection = AngleSelection(
-            mainframe, self._angle, self._set_rotation_angle, padding=row_padding
-        )
-        self._angle_selection.grid(row=buttons_row, column=0, sticky="S")
-        self._angle_selection.grid_forget()
 
         if ultimate:
             # create partial circuit widget
@@ -127,22 +199,110 @@ class App:
             )
 
         # create reset button
+        page = self._create_button_page()
         self._reset_button = ttk.Button(
-            mainframe,
+            page,
             text="Play again",
             padding=row_padding,
             width=10,
             command=self._reset,
         )
-        self._reset_button.grid(row=buttons_row, column=0, sticky="S")
-        self._reset_button.grid_forget()
+        self._reset_button.grid(row=0, column=0, sticky="S")
+        self._button_pages[self._reset_button] = page
 
         # create collapse label
+        page = self._create_button_page()
         self._collapse_label = ttk.Label(
-            mainframe, text="Choose a board to collapse", padding=row_padding
+            page, text="Choose a board to collapse", padding=row_padding
         )
-        self._collapse_label.grid(row=buttons_row, column=0)
-        self._collapse_label.grid_forget()
+        self._collapse_label.grid(row=0, column=0)
+        self._button_pages[self._collapse_label] = page
+
+        self._show_buttons(self._move_selection)
+
+        # stop the worker threads when the window is closed
+        root.protocol("WM_DELETE_WINDOW", self.close)
+
+    def close(self) -> None:
+        """Close the application.
+
+        Stops the worker threads without waiting for a running move or render, and
+        destroys the root widget.
+        """
+
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._board.close()
+        self._root.destroy()
+
+    def _create_button_page(self) -> ttk.Frame:
+        """Create a page in the buttons row stack.
+
+        Returns:
+            page covering the whole buttons row
+        """
+
+        page = ttk.Frame(self._button_stack)
+        page.grid(row=0, column=0, sticky="NSEW")
+        page.rowconfigure(0, weight=1)
+        page.columnconfigure(0, weight=1)
+        # keep the shown page on top
+        page.lower()
+
+        return page
+
+    def _get_number_selection(self) -> NumberSelection:
+        """Get the number of qubits selection widget. Creates it when first needed.
+
+        Returns:
+            number of qubits selection widget
+        """
+
+        if self._number_selection is None:
+            page = self._create_button_page()
+            self._number_selection = NumberSelection(
+                page, 2, 2, self._select_number_of_qubits, padding=self._row_padding
+            )
+            self._number_selection.grid(row=0, column=0, sticky="S")
+            self._button_pages[self._number_selection] = page
+
+        return self._number_selection
+
+    def _get_angle_selection(self) -> AngleSelection:
+        """Get the angle selection widget. Creates it when first needed.
+
+        Returns:
+            angle selection widget
+        """
+
+        if self._angle_selection is None:
+            page = self._create_button_page()
+            self._angle_selection = AngleSelection(
+                page, self._angle, self._set_rotation_angle, padding=self._row_padding
+            )
+            self._angle_selection.grid(row=0, column=0, sticky="S")
+            self._button_pages[self._angle_selection] = page
+
+        return self._angle_selection
+
+    def _show_buttons(self, widget: Widget | None) -> None:
+        """Show `widget` in the buttons row instead of the shown one.
+
+        Args:
+            widget: widget to show. None if showing nothing
+        """
+
+        self._button_pages[widget].tkraise()
+        self._shown_buttons = widget
+
+    def _hide_buttons(self, widget: Widget) -> None:
+        """Hide `widget` from the buttons row if it is shown.
+
+        Args:
+            widget: widget to hide
+        """
+
+        if self._shown_buttons is widget:
+            self._show_buttons(None)
 
     def _click_cell(self, board: int, cell: int) -> None:
         """Callback function for clicking on cell `cell` of board `board`.
@@ -152,46 +312,126 @@ class App:
             board: board index
         """
 
-        collapsed = set()
+        # ignore clicks while a move is running
+        if self._move_future is not None:
+            return
 
         self._disable_boards()
 
+        # read the angle from tk only once
+        angle = self._angle.get()
+
         match self._selected_move:
             # simple rotation
             case Move.RX | Move.RY | Move.RZ:
                 # set axis
-                axis = self._selected_move.get_axis()
-                self._remaining_angle -= abs(self._angle.get())
-
-                collapsed = self._game.rotate(
-                    board, cell, axis, float(self._angle.get()), self._number_to_rotate
+                axis = _AXIS_OF_MOVE[self._selected_move]
+                self._remaining_angle -= abs(angle)
+
+                self._start_move(
+                    board,
+                    cell,
+                    functools.partial(
+                        self._game.rotate, board, cell, axis, angle, self._number_to_rotate
+                    ),
                 )
-                # display angle selection again if more qubits to rotate
-                if self._game.has_moves():
-                    self._angle_selection.set_message("Set angle to rotate by")
-                    self._angle_selection.enable(self._remaining_angle)
-                else:
-                    self._angle_selection.grid_forget()
             # controlled rotation
             case Move.CRX | Move.CRY | Move.CRZ:
                 # control qubit has been selected - add gate
                 if self._game.has_control():
                     c_board, c_cell = self._game.get_control()
                     self._board.entangle(c_board, c_cell, board, cell)
-                    axis = self._selected_move.get_axis()
-                    collapsed = self._game.rotate_target(
-                        board, cell, axis, float(self._angle.get())
+                    axis = _AXIS_OF_MOVE[self._selected_move]
+                    self._start_move(
+                        board,
+                        cell,
+                        functools.partial(
+                            self._game.rotate_target,
+                            board,
+                            cell,
+                            axis,
+                            angle,
+                        ),
                     )
-                    self._angle_selection.grid_forget()
                 # set control qubit, ask for target qubit
                 else:
                     self._game.rotate_control(board, cell)
                     self._angle_selection.set_message("Choose target qubit")
                     self._angle_selection.disable()
                     self._enable_boards()
+                    self._update_after_move(board, cell, set())
             case Move.COLLAPSE:
-                collapsed = self._game.collapse(board)
-                self._collapse_label.grid_forget()
+                self._hide_buttons(self._collapse_label)
+                self._start_move(board, cell, functools.partial(self._game.collapse, board))
+
+    def _start_move(
+        self, board: int, cell: int, move: Callable[[], set[int]]
+    ) -> None:
+        """Run `move` on the worker thread.
+
+        The widgets that could start another move are disabled until it has finished.
+
+        Args:
+            board: board index of the clicked cell
+            cell: cell index of the clicked cell
+            move: game function making the move. Returns the collapsed boards
+        """
+
+        if self._angle_selection is not None:
+            self._angle_selection.disable()
+        self._hide_buttons(self._move_selection)
+
+        self._move_future = self._executor.submit(move)
+        self._root.after(_POLL_INTERVAL, self._poll_move, board, cell)
+
+    def _poll_move(self, board: int, cell: int) -> None:
+        """Finish the move if the worker thread has made it, check again later otherwise.
+
+        Args:
+            board: board index of the clicked cell
+            cell: cell index of the clicked cell
+        """
+
+        if not self._move_future.done():
+            self._root.after(_POLL_INTERVAL, self._poll_move, board, cell)
+            return
+
+        future = self._move_future
+        self._move_future = None
+
+        # raises the exception of the move if it failed
+        self._finish_move(board, cell, future.result())
+
+    def _finish_move(self, board: int, cell: int, collapsed: set[int]) -> None:
+        """Update the widgets after the worker thread has made a move.
+
+        Args:
+            board: board index of the clicked cell
+            cell: cell index of the clicked cell
+            collapsed: set of collapsed board indices
+        """
+
+        match self._selected_move:
+            case Move.RX | Move.RY | Move.RZ:
+                # display angle selection again if more qubits to rotate
+                if self._game.has_moves():
+                    self._angle_selection.set_message("Set angle to rotate by")
+                    self._angle_selection.enable(self._remaining_angle)
+                else:
+                    self._hide_buttons(self._angle_selection)
+            case Move.CRX | Move.CRY | Move.CRZ:
+                self._hide_buttons(self._angle_selection)
+
+        self._update_after_move(board, cell, collapsed)
+
+    def _update_after_move(self, board: int, cell: int, collapsed: set[int]) -> None:
+        """Update the boards and turn after a move.
+
+        Args:
+            board: board index of the clicked cell
+            cell: cell index of the clicked cell
+            collapsed: set of collapsed board indices
+        """
 
         # Touch cell to update the visuals
         self._board.touch_cell(board, cell, self._game.get_statevector(board, cell))
@@ -214,13 +454,7 @@ class App:
         """
 
         # set current move as rotation
-        match axis:
-            case Axis.X:
-                self._selected_move = Move.RX
-            case Axis.Y:
-                self._selected_move = Move.RY
-            case Axis.Z:
-                self._selected_move = Move.RZ
+        self._selected_move = ROTATION_OF_AXIS[axis]
 
         # get available boards
         boards = self._game.available_boards(self._selected_move)
@@ -238,13 +472,10 @@ class App:
         self._remaining_angle = self._game.max_angle
 
         # set max number of quibts
-        self._number_selection.set_max(max_n)
-
-        # hide move type widget
-        self._move_selection.grid_forget()
+        self._get_number_selection().set_max(max_n)
 
-        # show qubit number selection widget
-        self._number_selection.grid()
+        # show qubit number selection widget instead of move type widget
+        self._show_buttons(self._number_selection)
 
     def _rotate_controlled(self, axis: Axis) -> None:
         """Callback function for clicking controlled rotation move button.
@@ -254,24 +485,16 @@ class App:
         """
 
         # set current move
-        match axis:
-            case Axis.X:
-                self._selected_move = Move.CRX
-            case Axis.Y:
-                self._selected_move = Move.CRY
-            case Axis.Z:
-                self._selected_move = Move.CRZ
+        self._selected_move = CONTROLLED_ROTATION_OF_AXIS[axis]
 
         # set remaining angle
         self._remaining_angle = self._game.max_controlled_angle
 
-        # hide move type widget
-        self._move_selection.grid_forget()
-
-        # show angle selection widget
-        self._angle_selection.set_message("Set angle to rotate by")
-        self._angle_selection.enable(self._remaining_angle)
-        self._angle_selection.grid()
+        # show angle selection widget instead of move type widget
+        angle_selection = self._get_angle_selection()
+        angle_selection.set_message("Set angle to rotate by")
+        angle_selection.enable(self._remaining_angle)
+        self._show_buttons(angle_selection)
 
     def _collapse(self) -> None:
         """Callback function for clicking collapse move button."""
@@ -280,8 +503,7 @@ class App:
 
         # let player choose board when ultimate
         if self._ultimate:
-            self._move_selection.grid_forget()
-            self._collapse_label.grid()
+            self._show_buttons(self._collapse_label)
             self._enable_boards()
         else:
             self._click_cell(0, 0)
@@ -295,28 +517,28 @@ class App:
 
         self._number_to_rotate = n
 
-        # hide number selection
-        self._number_selection.grid_forget()
-
         max_angle = (
             self._remaining_angle
             if self._number_to_rotate == 1
             else self._remaining_angle - math.pi / 4
         )
 
-        # show angle selection
-        self._angle_selection.set_message("Set angle to rotate by")
-        self._angle_selection.enable(max_angle)
-        self._angle_selection.grid()
+        # show angle selection instead of number selection
+        angle_selection = self._get_angle_selection()
+        angle_selection.set_message("Set angle to rotate by")
+        angle_selection.enable(max_angle)
+        self._show_buttons(angle_selection)
 
     def _set_rotation_angle(self) -> None:
         """Callback function for setting the rotation angle."""
 
-        if self._angle.get() == 0:
+        angle = self._angle.get()
+
+        if angle == 0:
             self._angle_selection.set_message("Set angle to rotate by")
             self._disable_boards()
         else:
-            message = f"Rotate by {self._angle.get() / math.pi}\u03c0"
+            message = f"Rotate by {angle / math.pi}\u03c0"
             if self._selected_move in [Move.CRX, Move.CRY, Move.CRZ]:
                 message += ". Choose control qubit"
             self._angle_selection.set_message(message)
@@ -336,8 +558,7 @@ class App:
     def _disable_boards(self) -> None:
         """Disable all boards."""
 
-        for i in range(self._n_boards):
-            self._board.disable(i)
+        self._board.disable_all()
 
     def _update_boards(self, boards: set[int]) -> None:
         """Update `boards`.
@@ -360,7 +581,7 @@ class App:
         """Change turn."""
 
         self._turn = State.X if self._turn == State.O else State.O
-        self._info_text.set(f"It's {self._turn}'s turn")
+        self._info_text.set(self._turn_strings[self._turn])
 
     def _check_end(self) -> bool:
         """Check if game ended.
@@ -381,11 +602,8 @@ class App:
         else:
             self._info_text.set(f"{winner} has won!")
 
-        # hide move selection
-        self._move_selection.grid_forget()
-
-        # display reset button
-        self._reset_button.grid()
+        # display reset button instead of move selection
+        self._show_buttons(self._reset_button)
 
         return True
 
@@ -398,7 +616,7 @@ class App:
         enabled_moves = self._game.available_moves(self._moves)
 
         self._move_selection.enable(set(enabled_moves))
-        self._move_selection.grid()
+        self._show_buttons(self._move_selection)
 
     def _reset(self) -> None:
         """Reset the game."""
@@ -411,10 +629,10 @@ class App:
             self._board.reset(i)
 
         # hide again button
-        self._reset_button.grid_forget()
+        self._hide_buttons(self._reset_button)
 
         # set turn
-        self._info_text.set("It's X's turn")
+        self._info_text.set(self._turn_strings[State.X])
         self._turn = State.X
 
         # show move selection
@@ -423,13 +641,13 @@ class App:
     def _partial_circuit(self) -> None:
         """Callback function for printing partial circuit in the ultimate game."""
 
+        # the worker thread is changing the circuit
+        if self._move_future is not None:
+            return
+
         sub_board = self._sub_board.get()
 
-        try:
-            sub_board_number = int(sub_board)
-            if sub_board_number >= 1 and sub_board_number <= 9:
-                display_circuit_of_sub_board(self._game._qc, sub_board_number)
-        except ValueError:
-            pass
+        if sub_board in _VALID_SUB_BOARDS:
+            display_circuit_of_sub_board(self._game.circuit, int(sub_board))
 
         self._sub_board.set("")
@@ -18,9 +18,11 @@ def display_circuit_of_sub_board(circuit: QuantumCircuit, sub_board_number: int)
     # remove any dangling plots
     plt.close()
 
-    # save full circuit to a file
+    # save the gates of the sub-board on all qubits to a file, so the image can be cropped
     img_path = path.join(PATH, "images", "circuit_state.png")
-    circuit.draw("mpl", filename=img_path, initial_state=True)
+    sub_board_circuit(circuit, sub_board_number).draw(
+        "mpl", filename=img_path, initial_state=True
+    )
 
     img = mpimg.imread(img_path)
     plt.close()
@@ -33,6 +35,27 @@ def display_circuit_of_sub_board(circuit: QuantumCircuit, sub_board_number: int)
     plt.show(block=False)
 
 
+def sub_board_circuit(circuit: QuantumCircuit, sub_board_number: int) -> QuantumCircuit:
+    """Get the instructions of the circuit that act on the qubits of one of the sub-boards.
+
+    Args:
+        circuit: the full quantum circuit.
+        sub_board_number: the number of the sub-board that we are interested in. Has to be an integer between 1 and 9 inclusive.
+
+    Returns:
+        circuit with the same qubits and only the instructions of the sub-board.
+    """
+
+    qubits = set(circuit.qubits[9 * (sub_board_number - 1) : 9 * sub_board_number])
+
+    sub_circuit = circuit.copy_empty_like()
+    for instruction in circuit.data:
+        if not qubits.isdisjoint(instruction.qubits):
+            sub_circuit.append(instruction)
+
+    return sub_circuit
+
+
 def crop_circuit_image(img: np.ndarray, sub_board_number: int) -> np.ndarray:
     """Crop a given image to only contain the qubits of the chosen sub-board, and some surrounding ones.
 
@@ -19,8 +19,8 @@ class AngleSelection(ttk.Frame):
 
         self._angle_var = angle_var
 
-        # values from -pi with pi with pi/4 step
-        self._allowed_values = [math.pi * (i / 4) if i else 0 for i in range(-4, 5)]
+        # allowed values are multiples of pi/4. the slider keeps them between -pi and pi
+        self._step = math.pi / 4
 
         # create info label
         self._text = StringVar()
@@ -38,6 +38,10 @@ class AngleSelection(ttk.Frame):
         self._slider.grid(row=1, column=0)
 
         self._callback = callback
+        # the callback runs when idle, once for many slider moves. id of the scheduled call
+        self._callback_id = None
+        # whether the angle was 0 in the last callback. the boards are only enabled if not 0
+        self._was_zero = True
 
     def set_message(self, message: str) -> None:
         """Set prompt message.
@@ -52,6 +56,7 @@ class AngleSelection(ttk.Frame):
         """Disable the angle slider."""
 
         self._slider.configure(state="disabled")
+        self._cancel_callback()
 
     def enable(self, max: float) -> None:
         """Enable the angle slider.
@@ -62,7 +67,13 @@ class AngleSelection(ttk.Frame):
             max: max. angle
         """
         self._slider.configure(from_=-max, to=max, state="normal")
-        self._angle_var.set(0)
+
+        # writing the variable updates the slider, skip it if already 0
+        if self._angle_var.get() != 0:
+            self._angle_var.set(0)
+
+        self._cancel_callback()
+        self._was_zero = True
 
     def _change_angle(self, angle) -> None:
         """Callback function for changing the angle on the slider.
@@ -74,8 +85,27 @@ class AngleSelection(ttk.Frame):
         angle = float(angle)
 
         # round to allowed value
-        if angle not in self._allowed_values:
-            closest = min(self._allowed_values, key=lambda val: abs(val - angle))
+        closest = round(angle / self._step) * self._step
+        if abs(closest - angle) > 1e-9:
             self._slider.set(closest)
 
+        # enabling or disabling the boards can't wait, a click could come first
+        if (abs(closest) < 1e-9) != self._was_zero:
+            self._cancel_callback()
+            self._run_callback()
+        elif self._callback_id is None:
+            self._callback_id = self.after_idle(self._run_callback)
+
+    def _run_callback(self) -> None:
+        """Call the callback function for the last angle."""
+
+        self._callback_id = None
+        self._was_zero = abs(self._angle_var.get()) < 1e-9
         self._callback()
+
+    def _cancel_callback(self) -> None:
+        """Cancel the scheduled callback."""
+
+        if self._callback_id is not None:
+            self.after_cancel(self._callback_id)
+            self._callback_id = None
@@ -1,8 +1,12 @@
 from tkinter import Widget, ttk, Canvas
 from collections.abc import Callable
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
 from PIL import Image, ImageTk
 from qiskit.visualization import plot_bloch_vector
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from mpl_toolkits.mplot3d import Axes3D
 from numpy.exceptions import ComplexWarning
 from backend.enums import State
 from os import path
@@ -12,6 +16,61 @@ from gui import PATH
 # disable ComplexWarning
 warnings.filterwarnings("ignore", category=ComplexWarning)
 
+# bloch vectors that are equal when rounded to this many decimals share an image
+_BLOCH_PRECISION = 2
+# max. number of rendered bloch sphere images kept
+_BLOCH_CACHE_SIZE = 64
+# milliseconds between checks for finished bloch sphere images
+_POLL_INTERVAL = 20
+
+
+@functools.cache
+def _bloch_figure() -> tuple[FigureCanvasAgg, Axes3D]:
+    """Create the figure that bloch spheres are rendered on.
+
+    The figure is reused for every render. It is only used by the worker thread.
+
+    Returns:
+        (canvas of the figure, 3d axes covering the figure)
+    """
+
+    fig = Figure(figsize=(5, 5), dpi=50)
+    canvas = FigureCanvasAgg(fig)
+    ax = fig.add_axes((0, 0, 1, 1), projection="3d")
+
+    return canvas, ax
+
+
+def _render_bloch(state_vector: list[float]) -> Image.Image:
+    """Render the bloch sphere of `state_vector`.
+
+    Runs on the worker thread, so the figure is not managed by pyplot. The image is taken
+    from the rendered pixels, without writing a file.
+
+    Args:
+        state_vector: bloch vector to render
+
+    Returns:
+        the rendered image
+    """
+
+    canvas, ax = _bloch_figure()
+
+    ax.clear()
+    plot_bloch_vector(state_vector, ax=ax)
+
+    # transparent background
+    for patch in (canvas.figure.patch, ax.patch):
+        patch.set_facecolor("none")
+        patch.set_edgecolor("none")
+
+    canvas.draw()
+
+    # copy, the buffer is reused by the next render
+    return Image.frombuffer(
+        "RGBA", canvas.get_width_height(), canvas.buffer_rgba(), "raw", "RGBA", 0, 1
+    ).copy()
+
 
 class Board(ttk.Frame):
     """Widget represeting the board."""
@@ -51,45 +110,63 @@ class Board(ttk.Frame):
         self._cell_enabled_color = "#FFFFFF"
 
         self._canvas = Canvas(self, width=width, height=width, highlightthickness=0)
-        self._canvas.bind("<Button-1>", lambda event: self._on_click(event))
+        self._canvas.bind("<Button-1>", self._on_click)
         self._canvas.grid()
 
         self._width = width
+        # number of cell rows and columns on the whole board
+        self._n_lines = 9 if ultimate else 3
 
-        self._grid_line_ids = []
+        # cell positions on canvas, computed when needed
+        self._cell_pos = None
 
-        # cell backgrounds
-        self._cell_bg_ids = [[] for _ in range(n_boards)]
+        # current line width of each grid tag
+        self._grid_line_widths = {}
+
+        # cell backgrounds, tagged by board and by cell
         offset = self._board_width / 3 / 2
 
-        for b, cells in enumerate(self._cell_bg_ids):
+        for b in range(n_boards):
             for c in range(9):
-                x_centre, y_centre = self._index_to_pos(b, c)
-                id = self._canvas.create_rectangle(
+                x_centre, y_centre = self._cell_positions()[9 * b + c]
+                self._canvas.create_rectangle(
                     x_centre - offset,
                     y_centre - offset,
                     x_centre + offset,
                     y_centre + offset,
                     fill=self._cell_disabled_color,
                     width=0,
+                    tags=("cell_bg", f"cell_bg_{b}", f"cell_bg_{b}_{c}"),
                 )
-                cells.append(id)
 
         # create grid lines
-        self._create_grid(width, 0, 0)
-        # create sub-board grid lines if ultimate
+        self._create_grid([width / 3, width / 3 * 2], 0.01 * width, "grid")
+        # create sub-board grid lines if ultimate. sub-boards in the same row or column share the lines
         if ultimate:
-            for i in range(3):
-                for j in range(3):
-                    self._create_grid(
-                        self._board_width, i * self._board_width, j * self._board_width
-                    )
+            self._create_grid(
+                [
+                    i * self._board_width + self._board_width / 3 * j
+                    for i in range(3)
+                    for j in (1, 2)
+                ],
+                0.01 * self._board_width,
+                "sub_grid",
+            )
 
-        # list of enabled cells
-        self._enabled = [[False for _ in range(9)] for _ in range(self._n_boards)]
+        # enabled cells of each board. bit `c` is set iff cell `c` is enabled
+        self._enabled = [0] * self._n_boards
 
-        # list of entanglement lines, indexed by control qubit board index
-        self._entanglement_ids = [[] for _ in range(n_boards)]
+        # control qubit board indices of the entanglement lines.
+        # the lines of each board are tagged `entanglement_{board}`
+        self._entangled_boards = set()
+        # current width and arrow shape of the entanglement lines, scaled with the board
+        self._entanglement_width = 4
+        self._entanglement_arrow_shape = (20, 20, 5)
+
+        # rendered bloch sphere images by rounded bloch vector, least recently used first
+        self._bloch_imgs = {}
+        # (image, resized image) by (image id, width) for the current board size
+        self._tk_imgs = {}
 
         # Load the standard images
         self._default_bloch_img = self._import_img("Bloch_-1.png")
@@ -100,6 +177,15 @@ class Board(ttk.Frame):
         self._draw_img = self._import_img("draw.png")
         self._empty_img = self._import_img("empty.png")
 
+        # image of each collapsed cell state. other states show the default bloch image
+        self._state_imgs = {State.X: self._cross_img, State.O: self._circle_img}
+        # image of each subboard winner
+        self._win_imgs = {
+            State.X: self._cross_win_img,
+            State.O: self._circle_win_img,
+            State.DRAW: self._draw_img,
+        }
+
         self._default_bloch_img_tk = ImageTk.PhotoImage(self._default_bloch_img)
         self._empty_img_tk = ImageTk.PhotoImage(self._empty_img)
 
@@ -107,21 +193,18 @@ class Board(ttk.Frame):
         self._cell_image_ids = [
             [
                 self._canvas.create_image(
-                    self._index_to_pos(b, c),
+                    self._cell_positions()[9 * b + c],
                     anchor="center",
                     image=self._default_bloch_img_tk,
+                    tags=(f"cell_img_{b}", f"cell_img_{b}_{c}"),
                 )
                 for c in range(9)
             ]
             for b in range(self._n_boards)
         ]
 
-        self._win_image_ids = [
-            self._canvas.create_image(
-                self._index_to_pos(b, 4), anchor="center", image=self._empty_img_tk
-            )
-            for b in range(self._n_boards)
-        ]
+        # win images are created when a board is won for the first time
+        self._win_image_ids = [None] * self._n_boards
 
         # Save references to the images so they don't get garbage collected
         self._cell_image_refs = [
@@ -137,6 +220,18 @@ class Board(ttk.Frame):
             for _ in range(self._n_boards)
         ]
 
+        # last size from a resize event, applied when idle
+        self._pending_size = (width, width)
+        self._resize_scheduled = False
+
+        # bloch spheres are rendered on a worker thread
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        # bloch sphere images being rendered by rounded bloch vector
+        self._bloch_renders: dict[tuple, Future] = {}
+        # render each touched cell is waiting for by (board, cell)
+        self._bloch_futures: dict[tuple[int, int], Future] = {}
+        self._bloch_poll_scheduled = False
+
         self.bind("<Configure>", self._on_resize)
 
     def entangle(self, c_board: int, c_cell: int, t_board: int, t_cell: int) -> None:
@@ -149,25 +244,24 @@ class Board(ttk.Frame):
             t_cell: target cell index
         """
 
-        cx, cy = self._index_to_pos(c_board, c_cell)
-        tx, ty = self._index_to_pos(t_board, t_cell)
+        positions = self._cell_positions()
+        cx, cy = positions[9 * c_board + c_cell]
+        tx, ty = positions[9 * t_board + t_cell]
 
-        width = 4
         color = "#FFA35C"
-        arrow_shape = (20, 20, 5)
 
-        self._entanglement_ids[c_board].append(
-            self._canvas.create_line(
-                cx,
-                cy,
-                tx,
-                ty,
-                width=width,
-                fill=color,
-                arrowshape=arrow_shape,
-                arrow="last",
-            )
+        self._canvas.create_line(
+            cx,
+            cy,
+            tx,
+            ty,
+            width=self._entanglement_width,
+            fill=color,
+            arrowshape=self._entanglement_arrow_shape,
+            arrow="last",
+            tags=("entanglement", f"entanglement_{c_board}"),
         )
+        self._entangled_boards.add(c_board)
 
     def enable(self, board: int, cells: list[int]) -> None:
         """Enable `cells` of `board`.
@@ -178,10 +272,18 @@ class Board(ttk.Frame):
         """
 
         for c in cells:
-            self._enabled[board][c] = True
-            self._canvas.itemconfigure(
-                self._cell_bg_ids[board][c], fill=self._cell_enabled_color
-            )
+            self._enabled[board] |= 1 << c
+
+        if not cells:
+            return
+
+        # recolour the cell backgrounds with one call. a tag expression selects the cells
+        if len(cells) == 9:
+            tag = f"cell_bg_{board}"
+        else:
+            tag = "||".join(f"cell_bg_{board}_{c}" for c in cells)
+
+        self._canvas.itemconfigure(tag, fill=self._cell_enabled_color)
 
     def disable(self, board: int) -> None:
         """Disable `board`.
@@ -190,10 +292,18 @@ class Board(ttk.Frame):
             board: board index
         """
 
-        self._enabled[board] = [False for _ in range(9)]
+        self._enabled[board] = 0
+
+        # recolour the cell backgrounds of the board with one call
+        self._canvas.itemconfigure(f"cell_bg_{board}", fill=self._cell_disabled_color)
 
-        for id in self._cell_bg_ids[board]:
-            self._canvas.itemconfigure(id, fill=self._cell_disabled_color)
+    def disable_all(self) -> None:
+        """Disable all boards."""
+
+        self._enabled = [0] * self._n_boards
+
+        # recolour every cell background with one call
+        self._canvas.itemconfigure("cell_bg", fill=self._cell_disabled_color)
 
     def reset(self, board) -> None:
         """Reset the `board` to its default state.
@@ -205,37 +315,56 @@ class Board(ttk.Frame):
         """
 
         # reset symbols to default bloch
-        for cell in range(9):
-            self._set_cell_image(board, cell, self._default_bloch_img)
+        self._discard_bloch_renders(board)
+        self._set_cell_images(board, range(9), self._default_bloch_img)
 
         # delete lines
-        self._canvas.delete(*self._entanglement_ids[board])
-        self._entanglement_ids[board].clear()
+        self._canvas.delete(f"entanglement_{board}")
+        self._entangled_boards.discard(board)
 
         # clear win symbol
-        self._set_win_image(board, self._empty_img)
+        if self._win_image_refs[board]["img"] is not self._empty_img:
+            self._set_win_image(board, self._empty_img)
 
     def update_display(self, board: int, states: list[State]) -> None:
         """Update symbols to display on `board`.
 
-        Sets symbols according to cell states on board.
+        Sets symbols according to cell states on board. Deletes entanglement lines and the win symbol.
+        Only the cells showing a different image are changed, with one call for each image.
 
         Args:
             board: board index
             states: cell states on board
         """
 
-        self.reset(board)
+        # delete lines
+        if board in self._entangled_boards:
+            self._canvas.delete(f"entanglement_{board}")
+            self._entangled_boards.discard(board)
+
+        # clear win symbol
+        if self._win_image_refs[board]["img"] is not self._empty_img:
+            self._set_win_image(board, self._empty_img)
+
+        self._discard_bloch_renders(board)
+
+        refs = self._cell_image_refs[board]
+
+        state_imgs = self._state_imgs
+
+        # cells to change, grouped by their new image. images are not hashable
+        changed = {}
 
         for i in range(9):
-            if states[i] == State.X:
-                img = self._cross_img
-            elif states[i] == State.O:
-                img = self._circle_img
-            else:
-                img = self._default_bloch_img
+            img = state_imgs.get(states[i], self._default_bloch_img)
 
-            self._set_cell_image(board, i, img)
+            # touched cells show their own bloch image, so they are always replaced
+            if refs[i]["img"] is not img:
+                changed.setdefault(id(img), (img, []))[1].append(i)
+
+        # one call for each image
+        for img, cells in changed.values():
+            self._set_cell_images(board, cells, img)
 
     def set_winner(self, board: int, winner: State) -> None:
         """Set subboard winner.
@@ -247,20 +376,14 @@ class Board(ttk.Frame):
             winner: subboard winner
         """
 
-        match winner:
-            case State.X:
-                img = self._cross_win_img
-            case State.O:
-                img = self._circle_win_img
-            case State.DRAW:
-                img = self._draw_img
-
-        self._set_win_image(board, img)
+        self._set_win_image(board, self._win_imgs[winner])
 
     def touch_cell(self, board: int, cell: int, state_vector: list[int]) -> None:
         """Touch `cell` on `board`.
 
-        Changes the representation of the cell.
+        Changes the representation of the cell. The bloch sphere is only rendered if no
+        image of a close enough state vector is cached. Rendering is done on a worker thread,
+        the cell keeps its image until it has finished.
 
         Args:
             board: board index
@@ -268,44 +391,124 @@ class Board(ttk.Frame):
             state_vector: state vector of the touched cell
         """
 
-        # generate image
-        img_path = path.join(PATH, "images", f"Bloch_{board}_{cell}.png")
+        key = tuple(round(x, _BLOCH_PRECISION) for x in state_vector)
 
-        plot_bloch_vector(state_vector).savefig(
-            img_path, transparent=True, dpi=50
-        )
-        plt.close()
+        if key not in self._bloch_imgs:
+            # generate image, unless the same state is already being rendered
+            future = self._bloch_renders.get(key)
+            if future is None:
+                future = self._executor.submit(_render_bloch, state_vector)
+                self._bloch_renders[key] = future
+
+            self._bloch_futures[board, cell] = future
+
+            if not self._bloch_poll_scheduled:
+                self._bloch_poll_scheduled = True
+                self.after(_POLL_INTERVAL, self._poll_bloch)
+            return
+
+        # an older render of the cell is outdated
+        self._bloch_futures.pop((board, cell), None)
+
+        # move to the end, dicts keep insertion order
+        img = self._bloch_imgs.pop(key)
+        self._bloch_imgs[key] = img
 
         # display image
-        img = self._import_img(f"Bloch_{board}_{cell}.png")
         self._set_cell_image(board, cell, img)
 
-    def _index_to_pos(self, board: int, cell: int) -> tuple[float, float]:
-        """Calculate cell positon on canvas from board and cell index.
+    def close(self) -> None:
+        """Stop rendering bloch spheres.
+
+        The running render is not waited for, the others are cancelled.
+        """
+
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _poll_bloch(self) -> None:
+        """Display the bloch sphere images rendered by the worker thread, check again later
+        if some are not finished."""
+
+        self._bloch_poll_scheduled = False
+
+        for key, future in list(self._bloch_renders.items()):
+            if not future.done():
+                continue
+
+            del self._bloch_renders[key]
+
+            try:
+                img = future.result()
+            except Exception as e:
+                # the waiting cells keep their image
+                print(f"Rendering the bloch sphere failed: {e!r}")
+                continue
+
+            # replace an older image of the state and drop the least recently used image
+            old = self._bloch_imgs.pop(key, None)
+            if old is not None and old is not img:
+                self._drop_tk_images(old)
+            if len(self._bloch_imgs) >= _BLOCH_CACHE_SIZE:
+                self._drop_tk_images(self._bloch_imgs.pop(next(iter(self._bloch_imgs))))
+            self._bloch_imgs[key] = img
+
+        for (board, cell), future in list(self._bloch_futures.items()):
+            if not future.done():
+                continue
+
+            del self._bloch_futures[board, cell]
+
+            # display image
+            if future.exception() is None:
+                self._set_cell_image(board, cell, future.result())
+
+        if self._bloch_renders:
+            self._bloch_poll_scheduled = True
+            self.after(_POLL_INTERVAL, self._poll_bloch)
+
+    def _discard_bloch_renders(self, board: int) -> None:
+        """Stop waiting for the bloch sphere images being rendered for `board`.
 
         Args:
             board: board index
-            cell: cell index
+        """
+
+        if self._bloch_futures:
+            for cell in range(9):
+                self._bloch_futures.pop((board, cell), None)
+
+    def _cell_positions(self) -> list[tuple[float, float]]:
+        """Get the positions of all cells on canvas.
+
+        The positions are calculated on first use after creating or resizing the board.
 
         Returns:
-            coordinates on canvas (x, y)
+            coordinates (x, y) of cell `cell` on board `board` at index `9 * board + cell`
         """
 
-        board_x_index = board % 3
-        board_y_index = board // 3
+        if self._cell_pos is None:
+            self._compute_positions()
 
-        board_offset = self._width / 3
+        return self._cell_pos
 
-        cell_x_index = cell % 3
-        cell_y_index = cell // 3
+    def _compute_positions(self) -> None:
+        """Calculate the positions of all cells on canvas.
 
+        The coordinates (x, y) of cell `cell` on board `board` are at index `9 * board + cell`.
+        """
+
+        board_offset = self._width / 3
         cell_offset = self._board_width / 3
         cell_start = cell_offset / 2
 
-        x = board_x_index * board_offset + cell_start + cell_x_index * cell_offset
-        y = board_y_index * board_offset + cell_start + cell_y_index * cell_offset
-
-        return (x, y)
+        self._cell_pos = [
+            (
+                (board % 3) * board_offset + cell_start + (cell % 3) * cell_offset,
+                (board // 3) * board_offset + cell_start + (cell // 3) * cell_offset,
+            )
+            for board in range(self._n_boards)
+            for cell in range(9)
+        ]
 
     def _set_cell_image(self, board: int, cell: int, img: Image.Image) -> None:
         """Set the image of `cell` on `board`.
@@ -318,14 +521,39 @@ class Board(ttk.Frame):
             img: image set the cell to
         """
 
-        width = int(self._board_width / 3)
-        tk_img = ImageTk.PhotoImage(img.resize((width, width)))
+        tk_img = self._tk_image(img, int(self._board_width / 3))
 
         self._cell_image_refs[board][cell]["img"] = img
         self._cell_image_refs[board][cell]["img_tk"] = tk_img
 
         self._canvas.itemconfigure(self._cell_image_ids[board][cell], image=tk_img)
 
+    def _set_cell_images(self, board: int, cells: list[int], img: Image.Image) -> None:
+        """Set the image of `cells` on `board`.
+
+        The cells share the resized image and are changed with one call.
+
+        Args:
+            board: board index
+            cells: cell indices
+            img: image set the cells to
+        """
+
+        tk_img = self._tk_image(img, int(self._board_width / 3))
+
+        refs = self._cell_image_refs[board]
+        for c in cells:
+            refs[c]["img"] = img
+            refs[c]["img_tk"] = tk_img
+
+        # a tag expression selects the cells
+        if len(cells) == 9:
+            tag = f"cell_img_{board}"
+        else:
+            tag = "||".join(f"cell_img_{board}_{c}" for c in cells)
+
+        self._canvas.itemconfigure(tag, image=tk_img)
+
     def _set_win_image(self, board: int, img: Image.Image) -> None:
         """Set the winner image for `board`.
 
@@ -335,13 +563,55 @@ class Board(ttk.Frame):
             board: board index
             img: win image
         """
-        width = int(self._board_width)
-        tk_img = ImageTk.PhotoImage(img.resize((width, width)))
+        tk_img = self._tk_image(img, int(self._board_width))
 
         self._win_image_refs[board]["img"] = img
         self._win_image_refs[board]["img_tk"] = tk_img
 
-        self._canvas.itemconfigure(self._win_image_ids[board], image=tk_img)
+        if self._win_image_ids[board] is None:
+            self._win_image_ids[board] = self._canvas.create_image(
+                self._cell_positions()[9 * board + 4], anchor="center", image=tk_img
+            )
+            # keep it above the cells and below the entanglement lines
+            self._canvas.tag_raise(
+                self._win_image_ids[board], self._cell_image_ids[-1][-1]
+            )
+        else:
+            self._canvas.itemconfigure(self._win_image_ids[board], image=tk_img)
+
+    def _tk_image(self, img: Image.Image, width: int) -> ImageTk.PhotoImage:
+        """Get `img` resized to `width` for displaying on the canvas.
+
+        Resized images are cached until the board is resized, so items showing the same
+        image share it.
+
+        Args:
+            img: image
+            width: width and height to resize to
+
+        Returns:
+            the resized image
+        """
+
+        # images are not hashable. the image is kept to check that the id is not reused
+        key = (id(img), width)
+        cached = self._tk_imgs.get(key)
+
+        if cached is None or cached[0] is not img:
+            cached = img, ImageTk.PhotoImage(img.resize((width, width)))
+            self._tk_imgs[key] = cached
+
+        return cached[1]
+
+    def _drop_tk_images(self, img: Image.Image) -> None:
+        """Remove the resized versions of `img` from the cache.
+
+        Args:
+            img: image
+        """
+
+        for key in [key for key, cached in self._tk_imgs.items() if cached[0] is img]:
+            del self._tk_imgs[key]
 
     def _import_img(self, name: str) -> Image.Image:
         """Imports the desired image.
@@ -358,7 +628,10 @@ class Board(ttk.Frame):
 
         try:
             img_path = path.join(PATH, "images", name)
-            return Image.open(img_path)
+            img = Image.open(img_path)
+            # read the pixels now, which closes the file
+            img.load()
+            return img
         except FileNotFoundError:
             print(f"Image not found at {img_path}. Please check the path.")
             raise
@@ -374,72 +647,71 @@ class Board(ttk.Frame):
             (board index, cell index) at (x, y)
         """
 
-        board_x_index = 0
-        board_y_index = 0
+        # column and row of the cell on the whole board. dividing last keeps integer
+        # coordinates on a cell border exact, multiplying by a reciprocal would not
+        column = int(x * self._n_lines / self._width)
+        row = int(y * self._n_lines / self._width)
+        if column >= self._n_lines:
+            column = self._n_lines - 1
+        if row >= self._n_lines:
+            row = self._n_lines - 1
 
-        if self._ultimate:
-            board_x_index = int(min(x / self._width * 3, 2))
-            board_y_index = int(min(y / self._width * 3, 2))
+        # 3 cells per board, a single board is at (0, 0)
+        board_x_index, cell_x_index = divmod(column, 3)
+        board_y_index, cell_y_index = divmod(row, 3)
 
         board_index = board_y_index * 3 + board_x_index
-
-        board_offset = self._width / 3
-
-        x -= board_x_index * board_offset
-        y -= board_y_index * board_offset
-
-        cell_x_index = int(min(x / self._board_width * 3, 2))
-        cell_y_index = int(min(y / self._board_width * 3, 2))
-
         cell_index = cell_y_index * 3 + cell_x_index
 
         return board_index, cell_index
 
-    def _create_grid(self, width, x, y) -> None:
-        """Create grid lines.
+    def _create_grid(self, offsets: list[float], line_width: float, tag: str) -> None:
+        """Create grid lines across the whole canvas.
 
         Args:
-            width: grid width
-            x: upper left corner x-coordinate
-            y: upper left corner y-coordinate
+            offsets: distance of each vertical line from the left edge, and of each horizontal line from the top edge
+            line_width: line width
+            tag: tag of the lines
         """
 
-        x1 = width / 3 + x
-        x2 = width / 3 * 2 + x
-
-        y1 = width / 3 + y
-        y2 = width / 3 * 2 + y
-
-        line_width = 0.01 * width
+        self._grid_line_widths[tag] = line_width
 
-        # create vertical lines
-        self._grid_line_ids.append(
-            self._canvas.create_line(x1, y, x1, y + width, width=line_width)
-        )
-        self._grid_line_ids.append(
-            self._canvas.create_line(x2, y, x2, y + width, width=line_width)
-        )
-
-        # create horizontal lines
-        self._grid_line_ids.append(
-            self._canvas.create_line(x, y1, x + width, y1, width=line_width)
-        )
-        self._grid_line_ids.append(
-            self._canvas.create_line(x, y2, x + width, y2, width=line_width)
-        )
+        for offset in offsets:
+            # create vertical line
+            self._canvas.create_line(
+                offset, 0, offset, self._width, width=line_width, tags=tag
+            )
+            # create horizontal line
+            self._canvas.create_line(
+                0, offset, self._width, offset, width=line_width, tags=tag
+            )
 
     def _on_click(self, event):
         """Callback function for clicking on canvas."""
         board, cell = self._pos_to_index(event.x, event.y)
 
         # call callback function if clicked cell enabled
-        if self._enabled[board][cell]:
+        if self._enabled[board] >> cell & 1:
             self._callback(board, cell)
 
     def _on_resize(self, event):
-        """Callback function for resizing window."""
+        """Callback function for resizing window.
+
+        Resizing is done when idle, so only the last of many resize events is applied.
+        """
+
+        self._pending_size = (event.width, event.height)
 
-        width = min(event.width, event.height)
+        if not self._resize_scheduled:
+            self._resize_scheduled = True
+            self.after_idle(self._resize)
+
+    def _resize(self) -> None:
+        """Resize the board to the last size from `_on_resize`."""
+
+        self._resize_scheduled = False
+
+        width = min(self._pending_size)
 
         # change canvas size
         self._canvas.config(width=width, height=width)
@@ -450,35 +722,43 @@ class Board(ttk.Frame):
         # update width variables
         self._width = width
         self._board_width = width / 3 if self._ultimate else width
+        # cell positions are recalculated when needed
+        self._cell_pos = None
 
         # scale all objects on canvas
         self._canvas.scale("all", 0, 0, scale, scale)
 
-        # scale entanglement line width
-        for list in self._entanglement_ids:
-            for id in list:
-                width = float(self._canvas.itemcget(id, "width")) * scale
-                arrow_shape = self._canvas.itemcget(id, "arrowshape").split()
-
-                arrow_shape = (
-                    scale * float(arrow_shape[0]),
-                    scale * float(arrow_shape[1]),
-                    scale * float(arrow_shape[2]),
-                )
+        # scale entanglement line width, all lines share it
+        self._entanglement_width *= scale
+        self._entanglement_arrow_shape = tuple(
+            scale * length for length in self._entanglement_arrow_shape
+        )
+        self._canvas.itemconfigure(
+            "entanglement",
+            width=self._entanglement_width,
+            arrowshape=self._entanglement_arrow_shape,
+        )
 
-                self._canvas.itemconfigure(id, width=width, arrowshape=arrow_shape)
+        # scale grid line width, one call for each grid size
+        for tag, line_width in self._grid_line_widths.items():
+            self._grid_line_widths[tag] = line_width * scale
+            self._canvas.itemconfigure(tag, width=line_width * scale)
 
-        # scale grid line width
-        for id in self._grid_line_ids:
-            width = float(self._canvas.itemcget(id, "width")) * scale
-            self._canvas.itemconfigure(id, width=width)
+        # scale images. each image is resized once and shared by the items showing it
+        cell_width = int(self._board_width / 3)
+        win_width = int(self._board_width)
+        self._tk_imgs.clear()
 
-        # scale images
         for board in range(self._n_boards):
             # scale cell images
-            for cell in range(9):
-                self._set_cell_image(
-                    board, cell, self._cell_image_refs[board][cell]["img"]
+            for cell, refs in enumerate(self._cell_image_refs[board]):
+                refs["img_tk"] = self._tk_image(refs["img"], cell_width)
+                self._canvas.itemconfigure(
+                    self._cell_image_ids[board][cell], image=refs["img_tk"]
                 )
             # scale win symbol images
-            self._set_win_image(board, self._win_image_refs[board]["img"])
+            if self._win_image_ids[board] is None:
+                continue
+            refs = self._win_image_refs[board]
+            refs["img_tk"] = self._tk_image(refs["img"], win_width)
+            self._canvas.itemconfigure(self._win_image_ids[board], image=refs["img_tk"])
@@ -23,7 +23,8 @@ def main():
         )
     else:
         # backend = FakeSherbrooke()
-        backend = AerSimulator()  # use non-noisy simulation
+        # use non-noisy simulation. fuse gates already on the small circuits of the game
+        backend = AerSimulator(fusion_enable=True, fusion_threshold=5, fusion_max_qubit=4)
 
     QtttCLI(ultimate, moves, backend).play()
 
@@ -1,7 +1,6 @@
 from tkinter import Tk
 from gui.app import App
 from backend.quantum_tic_tac_toe import Move
-from qiskit_aer import AerSimulator
 from qiskit_ibm_runtime.fake_provider import FakeSherbrooke
 from qiskit_ibm_runtime import QiskitRuntimeService
 from backend.parser import create_parser
@@ -16,9 +15,6 @@ def main():
     root.geometry("700x700")
     root.minsize(500, 500)
 
-    # quit with escape
-    root.bind("<Escape>", lambda x: root.destroy())
-
     service = QiskitRuntimeService() if args.ibm else None
 
     moves = [Move.RY, Move.RZ, Move.CRX, Move.COLLAPSE]
@@ -31,9 +27,12 @@ def main():
         )
     else:
         # backend = FakeSherbrooke()
-        backend = AerSimulator(method="matrix_product_state")  # use non-noisy simulator
+        backend = None  # use the shared non-noisy simulator of the app
 
-    App(root, ultimate=ultimate, moves=moves, backend=backend)
+    app = App(root, ultimate=ultimate, moves=moves, backend=backend)
+
+    # quit with escape
+    root.bind("<Escape>", lambda x: app.close())
 
     root.mainloop()
 